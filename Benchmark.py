@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import tempfile
+
+import random as rand
+import StoreSimulator as sim
+
+def write_synthetic_item_list(file_path: str, item_count: int = 2000, tag_count: int = 40):
+    """
+    Writes an item list csv in the format of "ItemList.csv" with randomly generated items.
+
+    file_path: Path of the csv file to create.
+
+    item_count: Number of items in the list.
+
+    tag_count: Number of distinct tags that items are given.
+    """
+
+    with open(file_path, "w") as item_file:
+        item_file.write("Item Id,Name,Vendor,Cost (USD),Stock,Tags,Weight\n")
+
+        for item_id in range(item_count):
+            tags = ["Tag " + str(rand.randint(0, tag_count - 1)) for _ in range(rand.randint(1, 3))]
+
+            item_file.write(str(item_id) + ",Item " + str(item_id) + ",Vendor " + str(item_id % 25) + "," + "{:.2f}".format(rand.random() * 50 + 0.5) + ","
+                            + str(rand.randint(50, 500)) + ",\"" + str(tags) + "\"," + str(rand.randint(1, 3)) + "\n")
+
+
+
+def is_gil_enabled() -> bool:
+    """
+    Returns True if the interpreter runs with the global interpreter lock.
+    """
+
+    if hasattr(sys, "_is_gil_enabled"):
+        return sys._is_gil_enabled()
+
+    return True
+
+
+
+def benchmark_worker_threads(thread_counts: list = [1, 2, 4, 8], item_count: int = 2000, customer_count: int = 2000, seed: int = 0):
+    """
+    Times one simulated day for each thread count in concurrent mode and prints the speedup over a single thread.
+
+    Thread scaling is only expected on a free-threaded build of Python. With the global interpreter lock the threads take turns.
+    """
+
+    print("Concurrent mode benchmark")
+    print("GIL enabled: " + str(is_gil_enabled()) + ", CPU count: " + str(os.cpu_count()) + "\n")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        item_list_path = os.path.join(temp_dir, "BenchmarkItems.csv")
+
+        rand.seed(seed)
+        write_synthetic_item_list(item_list_path, item_count)
+
+        base_time = None
+
+        for thread_count in thread_counts:
+            rand.seed(seed)
+
+            store = sim.StoreSimulator(item_list_path, 9, 18, 5, False, "Benchmark Store", thread_count)
+            customer_list = store.create_random_customer_list(customer_count)
+
+            start = time.perf_counter()
+
+            # Every customer can enter in the first intervals so the store stays busy
+            store.simulate_one_day(customer_list, False, 1.0, customer_count)
+
+            elapsed = time.perf_counter() - start
+            store.shutdown_workers()
+
+            if base_time is None:
+                base_time = elapsed
+
+            print("Threads: " + str(thread_count) + "    Seconds: " + "{:.3f}".format(elapsed) + "    Speedup: " + "{:.2f}".format(base_time / elapsed)
+                  + "    Transactions: " + str(len(store.customer_transactions)))
+
+
+
+if __name__ == "__main__":
+    benchmark_worker_threads()
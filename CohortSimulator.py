@@ -0,0 +1,542 @@
+import time
+import bisect
+
+import random as rand
+import StoreSimulator as sim
+
+# numpy is only needed for cohort simulation
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class CohortSimulator:
+    # Buy attempts are tracked in tenths, so a look (0.2 attempts) and a buy (1 attempt) move customers a whole number of buckets
+    ATTEMPT_UNITS = 10
+    LOOK_UNITS = 2
+    BUY_UNITS = 10
+
+    # Upper bounds of the starting money bands that customers are grouped by
+    DEFAULT_MONEY_BANDS = [10, 25, 50, 100, 200, 400]
+
+
+    def __init__(self, store: sim.StoreSimulator, money_bands: list = DEFAULT_MONEY_BANDS, seed: int = None):
+        """
+        Initializes a Cohort Simulator object, which approximates a store's day by moving groups of customers instead of single customers.
+
+        Customers are grouped into cohorts by tags, starting money band, and credit use. Each action interval, the number of customers that look, buy, and leave in a cohort are drawn from binomial distributions, and the items bought are drawn from a multinomial distribution over the items in stock.
+
+        store: Store Simulator object that the item list, stock, hours, and action chances are taken from. The store is not changed unless apply_stock_to_store is called.
+
+        money_bands: Upper bounds of the starting money bands.
+
+        seed: Seed for the cohort simulator's random numbers.
+        """
+
+        if np is None:
+            raise ImportError("Cohort simulation needs numpy. Install it with 'pip install numpy'.")
+
+        self.store = store
+        self.money_bands = sorted(money_bands)
+        self.rng = np.random.default_rng(seed)
+
+        catalog = store.get_catalog_arrays()
+
+        self.item_ids = catalog["Item Id"]
+        self.item_costs = np.array(catalog["Cost (USD)"], dtype=np.float64)
+        self.item_weights = np.array(catalog["Weight"], dtype=np.float64)
+        self.item_tag_masks = catalog["Tag Mask"]
+        self.stock = np.array(catalog["Stock"], dtype=np.int64)
+
+        # Stock when the cohort simulator was made, used by apply_stock_to_store
+        self.initial_stock = self.stock.copy()
+
+        self.start_minute = store.start_hour * 60
+        self.end_minute = store.end_hour * 60
+        self.action_interval_minutes = store.action_interval_minutes
+
+        # Cohort data, one entry per cohort
+        self.cohort_keys = {}
+        self.cohort_masks = []
+        self.cohort_credit = []
+        self.cohort_money_sums = []
+        self.cohort_counts = []
+
+        # Number of customers in each cohort by starting buy attempts in tenths
+        self.cohort_attempts = []
+
+        # Item rows that each cohort wants
+        self.cohort_items = []
+
+
+
+    def add_customers(self, customer_list: list):
+        """
+        Adds each customer in the customer list to their cohort. Customers are counted using their starting money and buy attempts.
+        """
+
+        for customer in customer_list:
+            cohort = self.__get_cohort(self.store.encode_tags(customer.item_tags), customer.starting_money, customer.using_credit)
+
+            self.__add_to_cohort(cohort, 1, customer.starting_money, customer.starting_buy_attempts)
+
+
+
+    def add_cohort(self, tags: list, count: int, money: float, max_buy_attempts: float, using_credit: bool):
+        """
+        Adds a number of identical customers without making Customer objects, for populations too large to keep as objects.
+
+        tags: Tags of the customers.
+
+        count: Number of customers.
+
+        money: Starting money of each customer.
+
+        max_buy_attempts: Starting buy attempts of each customer.
+
+        using_credit: Allows the customers to spend more money than they brought.
+        """
+
+        cohort = self.__get_cohort(self.store.encode_tags(tags), money, using_credit)
+
+        self.__add_to_cohort(cohort, count, money * count, max_buy_attempts)
+
+
+
+    def get_cohort_count(self) -> int:
+        """
+        Returns the number of cohorts.
+        """
+
+        return len(self.cohort_keys)
+
+
+
+    def simulate_one_day(self, customer_enter_chance: float = 0.1, customer_enter_max: int = 3) -> dict:
+        """
+        Simulates one day and returns a dict of its results. Stock carries over to the next call.
+
+        The dict has:
+            income: Money spent by all customers.
+            transactions: Number of customers that left the store.
+            units: Array of units sold for each row of the item list.
+            revenue: Array of revenue for each row of the item list.
+            ending_stock: Array of stock for each row when the store closes.
+            minutes: List of the minute of each action interval.
+            stock_trajectory: 2D array of the stock of each row after each action interval.
+
+        customer_enter_chance: The chance that customers enter the store at every action interval.
+
+        customer_enter_max: The max amount of customers that can enter the store at any action interval.
+        """
+
+        cohort_count = len(self.cohort_keys)
+        bucket_count = max([len(attempts) for attempts in self.cohort_attempts] + [1])
+
+        # Customers that have not entered yet, by cohort and starting buy attempts
+        waiting = np.zeros((cohort_count, bucket_count), dtype=np.int64)
+
+        for cohort in range(cohort_count):
+            waiting[cohort, :len(self.cohort_attempts[cohort])] = self.cohort_attempts[cohort]
+
+        average_money = np.array([self.cohort_money_sums[cohort] / self.cohort_counts[cohort] for cohort in range(cohort_count)])
+
+        # Which items each cohort wants
+        self.cohort_matches = np.zeros((cohort_count, len(self.item_ids)), dtype=np.float64)
+
+        for cohort in range(cohort_count):
+            self.cohort_matches[cohort, self.cohort_items[cohort]] = 1.0
+
+        self.cohort_credit_array = np.array(self.cohort_credit, dtype=bool)
+
+        # Customers in the store, by cohort and remaining buy attempts, and the money they have left
+        in_store = np.zeros((cohort_count, bucket_count), dtype=np.int64)
+        money = np.zeros((cohort_count, bucket_count), dtype=np.float64)
+
+        units = np.zeros(len(self.item_ids), dtype=np.int64)
+        revenue = np.zeros(len(self.item_ids), dtype=np.float64)
+        transactions = 0
+
+        minutes = []
+        stock_trajectory = []
+
+        # Allows customers to enter at the start hour
+        current_minute = self.start_minute - self.action_interval_minutes
+
+        while(True):
+            current_minute = current_minute + self.action_interval_minutes
+
+            # Check if the store should close
+            if current_minute >= self.end_minute:
+                transactions += int(in_store.sum())
+                break
+
+            # Customer actions for every cohort with customers in the store
+            transactions += self.__cohort_actions(in_store, money, units, revenue)
+
+            # Check if customers enter
+            if self.rng.random() < customer_enter_chance:
+                enter_count = int(self.rng.integers(1, customer_enter_max + 1))
+                waiting_count = int(waiting.sum())
+
+                if waiting_count > 0:
+                    if waiting_count > enter_count:
+                        # Pick which waiting customers enter, then find the cohort and buy attempts bucket of each
+                        picked = self.rng.choice(waiting_count, enter_count, replace=False)
+                        buckets = np.searchsorted(np.cumsum(waiting.ravel()), picked, side="right")
+                        entering = np.bincount(buckets, minlength=waiting.size).reshape(waiting.shape)
+                    else:
+                        entering = waiting.copy()
+
+                    waiting -= entering
+                    in_store += entering
+                    money += entering * average_money[:, None]
+
+            minutes.append(current_minute)
+            stock_trajectory.append(self.stock.copy())
+
+        return {
+            "income": round(float(revenue.sum()), 2),
+            "transactions": transactions,
+            "units": units,
+            "revenue": revenue,
+            "ending_stock": self.stock.copy(),
+            "minutes": minutes,
+            "stock_trajectory": np.array(stock_trajectory),
+        }
+
+
+
+    def apply_stock_to_store(self):
+        """
+        Changes the stock of the store by how much the cohort simulation changed it.
+        """
+
+        for row_index in np.flatnonzero(self.stock != self.initial_stock):
+            self.store.add_stock(self.item_ids[row_index], int(self.stock[row_index] - self.initial_stock[row_index]))
+
+        self.initial_stock = self.stock.copy()
+
+
+
+    def __cohort_actions(self, in_store: "np.ndarray", money: "np.ndarray", units: "np.ndarray", revenue: "np.ndarray") -> int:
+        """
+        Draws the actions of the customers in the store for one action interval, for every cohort at once, and returns the number that left.
+
+        in_store: Customers in the store by cohort and remaining buy attempts. Changed in place.
+
+        money: Money left of the customers in in_store. Changed in place.
+        """
+
+        cohorts = np.flatnonzero(in_store.sum(axis=1))
+
+        if len(cohorts) == 0:
+            return 0
+
+        counts = in_store[cohorts]
+        money_sums = money[cohorts]
+
+        # Average money of the customers in each bucket
+        average = np.divide(money_sums, counts, out=np.zeros(counts.shape), where=counts > 0)
+
+        # Customers with no buy attempts left leave
+        left = int(counts[:, 0].sum())
+
+        active = counts.copy()
+        active[:, 0] = 0
+
+        look_chance = self.store.look_chance
+        buy_chance = self.store.buy_chance
+        leave_chance = self.store.leave_chance
+
+        looking = self.rng.binomial(active, look_chance)
+        deciding = active - looking
+
+        if buy_chance + leave_chance > 0:
+            buying = self.rng.binomial(deciding, buy_chance / (buy_chance + leave_chance))
+        else:
+            buying = np.zeros(counts.shape, dtype=np.int64)
+
+        left += int((deciding - buying).sum())
+
+        # Looking customers lose LOOK_UNITS of buy attempts
+        new_counts = self.__shift_down(looking, CohortSimulator.LOOK_UNITS)
+        new_money = self.__shift_down(looking * average, CohortSimulator.LOOK_UNITS)
+
+        buyer_counts = buying.sum(axis=1)
+
+        if buyer_counts.sum() > 0:
+            # Weight of each item for each cohort, only counting wanted items in stock
+            weights = self.cohort_matches[cohorts] * (self.item_weights * (self.stock > 0))
+            weight_sums = weights.sum(axis=1)
+
+            # Buyers of cohorts with nothing left to buy leave
+            stranded = (weight_sums == 0) & (buyer_counts > 0)
+            left += int(buyer_counts[stranded].sum())
+            buying[stranded] = 0
+            buyer_counts[stranded] = 0
+
+            buyer_money = buying * average
+            shoppers = np.flatnonzero(buyer_counts)
+
+            if len(shoppers) > 0:
+                picks = self.rng.multinomial(buyer_counts[shoppers], weights[shoppers] / weight_sums[shoppers, None])
+
+                # Customers without credit can only buy items they can afford on average
+                budgets = buyer_money[shoppers].sum(axis=1) / buyer_counts[shoppers]
+                unaffordable = (self.item_costs[None, :] > budgets[:, None]) & ~self.cohort_credit_array[cohorts[shoppers], None]
+                picks[unaffordable] = 0
+
+                # Items wanted by more customers than there is stock for are shared out in proportion to demand
+                demand = picks.sum(axis=0)
+                short = demand > self.stock
+
+                if short.any():
+                    picks[:, short] = picks[:, short] * self.stock[short] // demand[short]
+
+                sold = picks.sum(axis=0)
+                spent = picks @ self.item_costs
+
+                self.stock -= sold
+                units += sold
+                revenue += sold * self.item_costs
+
+                # Spending is shared by the buyers in each bucket of a cohort
+                buyer_money[shoppers] -= spent[:, None] * buying[shoppers] / buyer_counts[shoppers, None]
+
+            # Buying customers lose BUY_UNITS of buy attempts
+            new_counts += self.__shift_down(buying, CohortSimulator.BUY_UNITS)
+            new_money += self.__shift_down(buyer_money, CohortSimulator.BUY_UNITS)
+
+        in_store[cohorts] = new_counts
+        money[cohorts] = new_money
+
+        return left
+
+
+
+    def __shift_down(self, values: "np.ndarray", shift: int) -> "np.ndarray":
+        """
+        Returns the values moved down by shift buckets, with anything below bucket 0 added to bucket 0.
+        """
+
+        output = np.zeros(values.shape, dtype=values.dtype)
+
+        if values.shape[1] > shift:
+            output[:, :-shift] = values[:, shift:]
+            output[:, 0] += values[:, :shift].sum(axis=1)
+        else:
+            output[:, 0] = values.sum(axis=1)
+
+        return output
+
+
+
+    def __get_cohort(self, tag_mask: int, money: float, using_credit: bool) -> int:
+        """
+        Returns the index of the cohort of the inputted customer data, making the cohort if it does not exist.
+        """
+
+        key = (tag_mask, bisect.bisect_left(self.money_bands, money), using_credit)
+
+        if key not in self.cohort_keys:
+            self.cohort_keys[key] = len(self.cohort_masks)
+            self.cohort_masks.append(tag_mask)
+            self.cohort_credit.append(using_credit)
+            self.cohort_money_sums.append(0.0)
+            self.cohort_counts.append(0)
+            self.cohort_attempts.append(np.zeros(1, dtype=np.int64))
+            self.cohort_items.append(np.array([row_index for row_index, item_mask in enumerate(self.item_tag_masks) if item_mask & tag_mask], dtype=np.int64))
+
+        return self.cohort_keys[key]
+
+
+
+    def __add_to_cohort(self, cohort: int, count: int, money_sum: float, max_buy_attempts: float):
+        """
+        Adds customers with the same buy attempts to a cohort.
+        """
+
+        bucket = max(int(round(max_buy_attempts * CohortSimulator.ATTEMPT_UNITS)), 0)
+
+        if bucket >= len(self.cohort_attempts[cohort]):
+            attempts = np.zeros(bucket + 1, dtype=np.int64)
+            attempts[:len(self.cohort_attempts[cohort])] = self.cohort_attempts[cohort]
+            self.cohort_attempts[cohort] = attempts
+
+        self.cohort_attempts[cohort][bucket] += count
+        self.cohort_money_sums[cohort] += money_sum
+        self.cohort_counts[cohort] += count
+
+
+
+def validate_against_exact(item_list_path: str = None, seeds: list = range(12), customer_count: int = 20000, start_hour: float = 9, end_hour: float = 18,
+                           action_interval_minutes: int = 5, customer_enter_chance: float = 1.0, customer_enter_max: int = 200, item_count: int = 500, tag_count: int = 6) -> dict:
+    """
+    Simulates one day with the exact engine and the cohort simulator for each seed, using the same random customers, and returns a dict comparing them.
+
+    The dict has the average "income", "transactions", "units", and "ending_stock" for "exact" and "cohort", the relative error and absolute difference of each, the largest difference in average units sold of an item, and the seconds that each engine took.
+    A relative error is inf when the exact value is 0 and the cohort value is not.
+
+    "seed_spread" has the standard deviation of each value across seeds for each engine, and "difference_standard_error" has the standard error of the average cohort minus exact difference, so a difference of more than about two standard errors is a bias rather than noise.
+
+    "stock_trajectory" compares the total stock after each action interval, averaged across seeds, with the largest and average absolute difference over the day and the minute of the largest.
+
+    The defaults are a large population, which is what the cohort simulator is for.
+
+    item_list_path: Path of the item list. Uses a synthetic item list written by Benchmark.write_synthetic_item_list with item_count items and tag_count tags if None. Few tags keep the number of cohorts low.
+    """
+
+    if item_list_path is None:
+        import os
+        import tempfile
+        import Benchmark as bm
+
+        with tempfile.TemporaryDirectory() as directory:
+            item_list_path = os.path.join(directory, "Items.csv")
+
+            rand.seed(0)
+            bm.write_synthetic_item_list(item_list_path, item_count, tag_count)
+
+            return validate_against_exact(item_list_path, seeds, customer_count, start_hour, end_hour, action_interval_minutes, customer_enter_chance, customer_enter_max)
+
+    names = ("income", "transactions", "units", "ending_stock")
+
+    # Value of each seed
+    values = {engine: {name: [] for name in names + ("seconds",)} for engine in ("exact", "cohort")}
+
+    item_units = {"exact": None, "cohort": None}
+    stock_trajectories = {"exact": None, "cohort": None}
+
+    # Minutes of the action intervals, the stock is compared after each one
+    minutes = []
+    minute = start_hour * 60
+
+    while(minute < end_hour * 60):
+        minutes.append(minute)
+        minute = minute + action_interval_minutes
+
+    for seed in seeds:
+        rand.seed(seed)
+
+        store = sim.StoreSimulator(item_list_path, start_hour, end_hour, action_interval_minutes, False, "Cohort Validation")
+        store.quiet = True
+        customer_list = store.create_random_customer_list(customer_count)
+
+        # The cohort simulator copies the stock before the exact engine changes it
+        cohort_simulator = CohortSimulator(store, seed=seed)
+        cohort_simulator.add_customers(customer_list)
+
+        exact_trajectory = []
+
+        # The exact day is run one action interval at a time, so its stock can be read after each one
+        start = time.perf_counter()
+        store.begin_day(customer_list, False, customer_enter_chance, customer_enter_max)
+
+        for minute in minutes:
+            store.run_until(store.minutes_to_time(minute + action_interval_minutes))
+            exact_trajectory.append(sum(store.get_catalog_arrays()["Stock"]))
+
+        store.run_until()
+        values["exact"]["seconds"].append(time.perf_counter() - start)
+
+        exact_units = np.array(store.sales_analytics.day_units, dtype=np.float64)
+
+        values["exact"]["income"].append(store.get_income_for_current_day())
+        values["exact"]["transactions"].append(len(store.customer_transactions))
+        values["exact"]["units"].append(exact_units.sum())
+        values["exact"]["ending_stock"].append(sum(store.get_catalog_arrays()["Stock"]))
+
+        start = time.perf_counter()
+        result = cohort_simulator.simulate_one_day(customer_enter_chance, customer_enter_max)
+        values["cohort"]["seconds"].append(time.perf_counter() - start)
+
+        values["cohort"]["income"].append(result["income"])
+        values["cohort"]["transactions"].append(result["transactions"])
+        values["cohort"]["units"].append(result["units"].sum())
+        values["cohort"]["ending_stock"].append(result["ending_stock"].sum())
+
+        for engine, engine_units, trajectory in (("exact", exact_units, np.array(exact_trajectory, dtype=np.float64)),
+                                                 ("cohort", result["units"].astype(np.float64), result["stock_trajectory"].sum(axis=1).astype(np.float64))):
+            item_units[engine] = engine_units if item_units[engine] is None else item_units[engine] + engine_units
+            stock_trajectories[engine] = trajectory if stock_trajectories[engine] is None else stock_trajectories[engine] + trajectory
+
+    seed_count = len(seeds)
+    output = {"seeds": seed_count}
+
+    for engine in values:
+        output[engine] = {name: float(np.mean(engine_values)) for name, engine_values in values[engine].items()}
+
+    output["relative_error"] = {}
+    output["absolute_difference"] = {}
+    output["seed_spread"] = {"exact": {}, "cohort": {}}
+    output["difference_standard_error"] = {}
+
+    for name in names:
+        exact_value = output["exact"][name]
+        difference = abs(output["cohort"][name] - exact_value)
+
+        # Any difference from an exact value of 0 is an infinite relative error
+        if exact_value != 0:
+            output["relative_error"][name] = difference / exact_value
+        else:
+            output["relative_error"][name] = float("inf") if difference != 0 else 0.0
+
+        output["absolute_difference"][name] = difference
+
+        for engine in ("exact", "cohort"):
+            output["seed_spread"][engine][name] = float(np.std(values[engine][name], ddof=1)) if seed_count > 1 else 0.0
+
+        # Both engines get the same customers for a seed, so the difference of each seed is what varies
+        differences = np.array(values["cohort"][name], dtype=np.float64) - np.array(values["exact"][name], dtype=np.float64)
+        output["difference_standard_error"][name] = float(np.std(differences, ddof=1) / np.sqrt(seed_count)) if seed_count > 1 else 0.0
+
+    output["max_item_units_difference"] = float(np.abs(item_units["cohort"] - item_units["exact"]).max() / seed_count)
+
+    stock_differences = np.abs(stock_trajectories["cohort"] - stock_trajectories["exact"]) / seed_count
+    largest = int(stock_differences.argmax())
+
+    output["stock_trajectory"] = {"minutes": minutes, "exact": stock_trajectories["exact"] / seed_count, "cohort": stock_trajectories["cohort"] / seed_count,
+                                  "max_difference": float(stock_differences[largest]), "max_difference_minute": minutes[largest],
+                                  "mean_difference": float(stock_differences.mean())}
+
+    return output
+
+
+
+def format_validation_report(report: dict) -> str:
+    """
+    Returns a validation report from validate_against_exact as text.
+    """
+
+    lines = ["Cohort Simulator Validation (" + str(report["seeds"]) + " seeds)", ""]
+    lines.append("Metric".ljust(16) + "Exact".rjust(12) + "Cohort".rjust(12) + "Abs. Diff".rjust(12) + "Rel. Error".rjust(12)
+                 + "Exact SD".rjust(12) + "Cohort SD".rjust(12) + "Diff. SE".rjust(12))
+
+    for name in ("income", "transactions", "units", "ending_stock"):
+        relative_error = report["relative_error"][name]
+
+        lines.append(name.ljust(16) + "{:.2f}".format(report["exact"][name]).rjust(12) + "{:.2f}".format(report["cohort"][name]).rjust(12)
+                     + "{:.2f}".format(report["absolute_difference"][name]).rjust(12) + ("inf" if relative_error == float("inf") else "{:.1%}".format(relative_error)).rjust(12)
+                     + "{:.2f}".format(report["seed_spread"]["exact"][name]).rjust(12) + "{:.2f}".format(report["seed_spread"]["cohort"][name]).rjust(12)
+                     + "{:.2f}".format(report["difference_standard_error"][name]).rjust(12))
+
+    stock_trajectory = report["stock_trajectory"]
+
+    lines.append("")
+    lines.append("A difference of more than about two Diff. SE is a bias of the cohort simulator rather than noise between seeds.")
+    lines.append("Largest average difference in units sold of one item: " + "{:.2f}".format(report["max_item_units_difference"]))
+    lines.append("Total stock after each action interval: largest difference " + "{:.2f}".format(stock_trajectory["max_difference"]) + " at "
+                 + "{}:{:02d}".format(int(stock_trajectory["max_difference_minute"] // 60), int(stock_trajectory["max_difference_minute"] % 60)) + ", average difference " + "{:.2f}".format(stock_trajectory["mean_difference"]))
+    lines.append("Seconds per day: exact " + "{:.4f}".format(report["exact"]["seconds"]) + ", cohort " + "{:.4f}".format(report["cohort"]["seconds"]))
+
+    return "\n".join(lines)
+
+
+
+if __name__ == "__main__":
+    print(format_validation_report(validate_against_exact()))
+    print()
+
+    # A small store, where simulating every customer is cheap
+    print(format_validation_report(validate_against_exact("ItemList.csv", range(10), 100, customer_enter_chance=0.3, customer_enter_max=3)))
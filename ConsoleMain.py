@@ -1,26 +1,195 @@
+import os
+import json
+import argparse
+
+import random as rand
 import StoreSimulator as sim
+import OutputWriter as ow
+import MetricsExporter as me
+import PriceSchedule as ps
+import ShardedDay as sd
+
+# Settings of a scenario file and their default values
+DEFAULT_SCENARIO = {
+    "store_name": "New Store",
+    "item_list": "ItemList.csv",
+    "start_hour": 9,
+    "end_hour": 18,
+    "action_interval_minutes": 5,
+    "worker_threads": 1,
+    "shards": None,
+    "customer_count": 100,
+    "max_money": 500,
+    "max_items": 10,
+    "customer_enter_chance": 0.1,
+    "customer_enter_max": 3,
+    "days": 1,
+    "seed": None,
+    "restock_rules": [],
+    "price_rules": [],
+    "output_format": "csv",
+    "stock_keyframe_interval": 7,
+    "transaction_history": False,
+    "metrics_textfile": None,
+    "metrics_port": None,
+    "clear_store_directory": False,
+}
+
+# Formats that a scenario can output
+#   csv: Stock and transaction csv files for every day, like the console, and a summary csv
+#   delta: Like csv, but stock changes are appended to one stock history csv with a full copy every stock_keyframe_interval days
+#   summary: Only a summary csv with one row per day
+#   none: No output files
+OUTPUT_FORMATS = ["csv", "delta", "summary", "none"]
+
+# transaction_history can be true to save every day to "<store name> History.sqlite3" in the store's directory, or the path of a database
+# metrics_textfile and metrics_port export live metrics of the run, see MetricsExporter.py
+# shards runs each day across that many worker processes, see ShardedDay.py
+
+
 
 def create_random_customer_list(store: sim.StoreSimulator, customer_count: int = 100, max_money: int = 500, max_items: int = 10) -> list:
     """
-    Creates a list of customers for the inputted store.
+    Creates a list of customers for the inputted store. See StoreSimulator.create_random_customer_list.
     """
 
-    output = []
+    return store.create_random_customer_list(customer_count, max_money, max_items)
+
+
+
+def load_scenario(scenario_path: str) -> dict:
+    """
+    Returns the settings of a scenario json file, with defaults for any missing settings. See "ExampleScenario.json" for an example.
+
+    The item list path is relative to the scenario file.
+    """
+
+    with open(scenario_path) as scenario_file:
+        scenario = json.load(scenario_file)
+
+    for name in scenario:
+        if name not in DEFAULT_SCENARIO:
+            raise ValueError("Unknown scenario setting '" + name + "'. Settings must be one of: " + ", ".join(DEFAULT_SCENARIO) + ".")
+
+    if scenario.get("output_format", DEFAULT_SCENARIO["output_format"]) not in OUTPUT_FORMATS:
+        raise ValueError("Unknown output format '" + str(scenario["output_format"]) + "'. Output format must be one of: " + ", ".join(OUTPUT_FORMATS) + ".")
+
+    output = DEFAULT_SCENARIO.copy()
+    output.update(scenario)
 
-    for _ in range(customer_count):
-        output.append(store.generate_random_customer(max_money, max_items))
+    output["item_list"] = os.path.join(os.path.dirname(os.path.abspath(scenario_path)), output["item_list"])
 
     return output
 
 
 
-def reset_customers(customer_list: list):
+def apply_restock_rules(store: sim.StoreSimulator, restock_rules: list) -> bool:
     """
-    Resets each customer in the customer list.
+    Adds stock to items based on the restock rules and returns True if any stock was added.
+
+    Each rule is a dict with:
+        threshold: Items at or below this stock are restocked.
+        quantity: Stock added to each of those items.
+        item_ids: Optional list of item ids that the rule is limited to.
+        every_days: Optional number of days between restocks. The rule runs after days that are a multiple of it.
     """
 
-    for customer in customer_list:
-        customer.reset_customer()
+    restocked = False
+
+    for rule in restock_rules:
+        if store.day % rule.get("every_days", 1) != 0:
+            continue
+
+        item_ids = store.get_low_stock_ids(rule["threshold"])
+
+        if "item_ids" in rule:
+            item_ids = [item_id for item_id in item_ids if item_id in rule["item_ids"]]
+
+        for item_id in item_ids:
+            store.add_stock(item_id, rule["quantity"])
+            restocked = True
+
+    return restocked
+
+
+
+def run_scenario(scenario_path: str) -> sim.StoreSimulator:
+    """
+    Runs every day of a scenario file without any prompts or console output and returns the store.
+    """
+
+    scenario = load_scenario(scenario_path)
+
+    if scenario["seed"] is not None:
+        rand.seed(scenario["seed"])
+
+    store = sim.StoreSimulator(scenario["item_list"], scenario["start_hour"], scenario["end_hour"], scenario["action_interval_minutes"], False, scenario["store_name"], scenario["worker_threads"])
+    store.quiet = True
+
+    # Day files are written in the background while the next day is simulated
+    store.output_writer = ow.OutputWriter()
+
+    if scenario["output_format"] == "delta":
+        store.enable_stock_history(scenario["stock_keyframe_interval"])
+
+    if scenario["transaction_history"] is True:
+        store.enable_transaction_history()
+    elif scenario["transaction_history"]:
+        store.enable_transaction_history(scenario["transaction_history"])
+
+    # Price rules are dicts, see PriceSchedule.add_rule
+    if len(scenario["price_rules"]) > 0:
+        store.price_schedule = ps.PriceSchedule(scenario["price_rules"])
+
+    if scenario["metrics_textfile"] is not None or scenario["metrics_port"] is not None:
+        store.metrics_exporter = me.MetricsExporter(scenario["metrics_textfile"], scenario["metrics_port"])
+
+    if scenario["clear_store_directory"]:
+        store.clear_store_directory()
+
+    customer_list = create_random_customer_list(store, scenario["customer_count"], scenario["max_money"], scenario["max_items"])
+
+    # Days of very large stores can be split across worker processes
+    sharded_day = None
+
+    if scenario["shards"] is not None:
+        sharded_day = sd.ShardedDay(store, scenario["shards"], scenario["seed"])
+
+    # One row per day for the summary csv
+    summary_rows = []
+
+    for _ in range(scenario["days"]):
+        if sharded_day is not None:
+            sharded_day.simulate_one_day(customer_list, False, scenario["customer_enter_chance"], scenario["customer_enter_max"])
+        else:
+            store.simulate_one_day(customer_list, False, scenario["customer_enter_chance"], scenario["customer_enter_max"])
+
+        summary_rows.append([store.day, "{:.2f}".format(store.get_income_for_current_day()), len(store.customer_transactions), sum(store.sales_analytics.day_units)])
+
+        if scenario["output_format"] in ("csv", "delta"):
+            store.output_stock()
+            store.output_transactions()
+
+        if apply_restock_rules(store, scenario["restock_rules"]) and scenario["output_format"] in ("csv", "delta"):
+            store.output_updated_stock()
+
+    store.shutdown_workers()
+
+    if sharded_day is not None:
+        sharded_day.close()
+
+    if scenario["output_format"] != "none":
+        store.output_writer.write_csv(store.get_output_path(store.store_name + " Summary.csv"), ["Day", "Income", "Transactions", "Units Sold"], summary_rows)
+
+    # Wait for every file before returning
+    store.output_writer.close()
+    store.output_writer = None
+
+    if store.metrics_exporter is not None:
+        store.metrics_exporter.close()
+        store.metrics_exporter = None
+
+    return store
 
 
 
@@ -34,11 +203,20 @@ def print_options(current_day: int):
     print("6: Add stock to all low stock items")
     print("7: Create updated stock csv")
     print("8: Clear store directory")
+    print("9: Get best sellers for current day (Day " + str(current_day) + ")")
     print("q: Quit\n")
 
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store Simulator Console")
+    parser.add_argument("--scenario", help="Path to a scenario json file. Runs the scenario without prompts instead of the console.")
+    args = parser.parse_args()
+
+    if args.scenario is not None:
+        run_scenario(args.scenario)
+        exit()
+
     # Set up the store for the simulation
     print("\nStore Simulator Console\n")
 
@@ -51,6 +229,9 @@ if __name__ == "__main__":
 
     store = sim.StoreSimulator(item_database, start_hour, end_hour, action_interval_in_mins, verbose, store_name)
 
+    # Csv files of a day are written in the background while the menu is used
+    store.output_writer = ow.OutputWriter()
+
     print("Starting store attributes: \n")
     print("Store Name:          " + store_name)
     print("Item Database:       " + item_database)
@@ -76,10 +257,8 @@ if __name__ == "__main__":
         
         match str(user_input):
             case "1":
-                # Reset customers
-                reset_customers(customer_list)
-                # Simulate one day
-                store.simulate_one_day(customer_list.copy(), False, 0.1, 3)
+                # Simulate one day, customers are reset when they enter
+                store.simulate_one_day(customer_list, False, 0.1, 3)
                 # Output to csv files
                 store.output_stock()
                 store.output_transactions()
@@ -205,9 +384,18 @@ if __name__ == "__main__":
                 user_input = input("\nEnter 'y' to confirm deletion: ")
                 if user_input == "y" or user_input == "Y":
                     store.clear_store_directory()
+            case "9":
+                # Get best sellers for this day
+                print("Day " + str(store.day) + " Best Sellers:")
+                for item_id, units, revenue in store.sales_analytics.get_best_sellers():
+                    print("Id:" + str(item_id) + " Units:" + str(units) + " Revenue:" + "{:.2f}".format(revenue))
+                user_input = input("\nEnter anything to continue: ")
+                print()
             case "q":
+                store.output_writer.close()
                 exit()
             case "Q":
+                store.output_writer.close()
                 exit()
             case "c":
                 # Hidden debug option
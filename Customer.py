@@ -1,3 +1,6 @@
+import copy
+
+import PurchaseLog as pl
 
 class Customer:
 
@@ -22,10 +25,19 @@ class Customer:
         
         # Used to determine what customers will buy
         self.item_tags = item_tags
+
+        # Bitmask of item_tags interned by a store simulator object, and the tag code table it was encoded with
+        self.tag_mask = None
+        self.tag_codes = None
         
         self.starting_money = money
         self.money = money
-        self.items_bought = {}
+
+        # Items bought are kept in the purchase log of the store the customer is in, see items_bought
+        self.purchase_log = None
+        self.purchase_handle = None
+        self.purchase_head = -1
+        self.purchase_generation = None
 
         # Used to determine the max amount of things the customer can buy
         self.max_buy_attempts = max_buy_attempts
@@ -37,32 +49,105 @@ class Customer:
         # Used to determine if a customer's money count can go into the negatives
         self.using_credit = using_credit
 
+        # Set by a store simulator object to the epoch of the day the customer was last in a store
+        self.day_epoch = None
+
+
+
+    def copy(self) -> "Customer":
+        """
+        Returns a copy of the customer that can buy items without changing this customer.
+        """
+
+        # Purchases are shared through the log, so the copy only needs its own head
+        return copy.copy(self)
+
+
+
+    @property
+    def items_bought(self) -> dict:
+        """
+        Returns a dict of item id to the number bought by the customer.
+        """
+
+        return {item_id: count for item_id, count, _ in self.get_purchases()}
+
+
+
+    @property
+    def items_paid(self) -> dict:
+        """
+        Returns a dict of item id to the total paid by the customer for it.
+        """
+
+        return {item_id: paid for item_id, _, paid in self.get_purchases()}
+
+
+
+    def get_purchases(self) -> list:
+        """
+        Returns a list of [item id, number bought, total paid] for each item the customer bought, in the order the items were first bought.
+        """
+
+        # Purchases from a day that the log has been cleared of are gone
+        if self.purchase_log is None or self.purchase_generation != self.purchase_log.generation:
+            return []
+
+        return self.purchase_log.get_customer_items(self.purchase_head)
+
+
+
+    def set_purchase_log(self, purchase_log: pl.PurchaseLog):
+        """
+        Sets the log that the customer's purchases are added to. This should only be set by a Store Simulator object.
+        """
+
+        self.purchase_log = purchase_log
+        self.purchase_handle = purchase_log.add_customer(self.name)
+        self.purchase_head = -1
+        self.purchase_generation = purchase_log.generation
+
 
 
-    def buy_item(self, item_id: int, item_cost: float) -> bool:
+    def buy_item(self, item_id: int, item_cost: float, minute: float = -1.0) -> bool:
         """
         Returns True if the customer bought the inputted item.
 
         item_id: Id of the item being bought.
 
         item_cost: Cost of the item being bought.
-        """
 
-        self.max_buy_attempts -= 1
+        minute: Minute of the day that the item was bought, -1 if it was not bought in a store.
+        """
 
         # Check if item can be bought
-        if (item_cost <= self.money) or self.using_credit:
-            self.money = self.money - item_cost
+        if self.pay_for_item(item_cost):
+            # Customers that buy outside of a store keep their own log
+            if self.purchase_log is None or self.purchase_generation != self.purchase_log.generation:
+                self.set_purchase_log(pl.PurchaseLog())
 
-            # Check if customer already bought the item
-            if item_id in self.items_bought:
-                self.items_bought[item_id] += 1
-            else:
-                self.items_bought[item_id] = 1
+            self.purchase_head = self.purchase_log.append(self.purchase_handle, item_id, item_cost, minute, self.purchase_head)
 
             return True
         else:
             return False 
+
+
+
+    def pay_for_item(self, item_cost: float) -> bool:
+        """
+        Returns True if the customer paid for an item. Uses a buy attempt like buy_item, but the purchase is not added to the customer's purchase log, so the caller has to add it.
+
+        item_cost: Cost of the item being bought.
+        """
+
+        self.max_buy_attempts -= 1
+
+        if (item_cost <= self.money) or self.using_credit:
+            self.money = self.money - item_cost
+            return True
+
+        return False
         
 
 
@@ -101,6 +186,24 @@ class Customer:
 
         del self.item_tags
         self.item_tags = new_tags
+
+        # The old tag mask no longer matches the tags
+        self.tag_mask = None
+        self.tag_codes = None
+
+
+
+    def set_tag_mask(self, tag_mask: int, tag_codes: dict):
+        """
+        Sets the customer's tag bitmask. This should only be set by a Store Simulator object.
+
+        tag_mask: Bitmask of the customer's tags.
+
+        tag_codes: The tag code table of the store that encoded the mask.
+        """
+
+        self.tag_mask = tag_mask
+        self.tag_codes = tag_codes
   
 
 
@@ -118,8 +221,7 @@ class Customer:
         Resets customer's bought items. Should not be called while the customer is in a store.
         """
 
-        del self.items_bought
-        self.items_bought = {}
+        self.purchase_head = -1
 
 
 
@@ -135,6 +237,19 @@ class Customer:
 
 
 
+    def start_day(self, day_epoch: int):
+        """
+        Resets the customer if they have not been in a store during the inputted day epoch. This should only be called by a Store Simulator object.
+
+        Customers are reset the first time they enter a store on a new day, so customers that stay home are never reset.
+        """
+
+        if self.day_epoch != day_epoch:
+            self.reset_customer()
+            self.day_epoch = day_epoch
+
+
+
     def get_money_difference(self) -> float:
         """
         Returns the difference between the customer's starting money and current money.
@@ -167,4 +282,4 @@ class Customer:
         toString() for the customer.
         """
 
-        return "Name: " + self.name + " ; Tags: " + ",".join(self.item_tags) + " ; Money: " + str(self.money) + " ; Bought: " + ",".join(self.items_bought) + " ; Remaining Buys: " + str(self.max_buy_attempts)
\ No newline at end of file
+        return "Name: " + self.name + " ; Tags: " + ",".join(self.item_tags) + " ; Money: " + str(self.money) + " ; Bought: " + ",".join(str(item_id) for item_id in self.items_bought) + " ; Remaining Buys: " + str(self.max_buy_attempts)
\ No newline at end of file
@@ -0,0 +1,412 @@
+import math
+import time
+
+import random as rand
+import StoreSimulator as sim
+
+from array import array
+
+# numba is only needed to compile the day kernel, without it the same kernel runs as plain Python
+try:
+    import numba
+    import numpy as np
+except ImportError:
+    numba = None
+    np = None
+
+# True if the day kernel runs as native code
+COMPILED = numba is not None
+
+# Tag masks are int64 in the kernel, so a store can have at most this many tags including "Any"
+MAX_TAGS = 63
+
+# Event types written by the kernel
+ENTER_EVENT = 0
+BUY_EVENT = 1
+LEAVE_EVENT = 2
+
+# Masks used by the random number generator, every step fits in an int64 so compiled and plain Python runs draw the same numbers
+WORD_MASK = 0xFFFFFFFF
+SPLITMIX_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+def compile_kernel(function):
+    """
+    Returns the function compiled with numba, or the function itself if numba is not installed.
+    """
+
+    if numba is None:
+        return function
+
+    return numba.njit(cache=True)(function)
+
+
+
+@compile_kernel
+def next_random(state) -> float:
+    """
+    Returns a random float in [0, 1) with 53 bits and advances the state. The generator is xorshift128 on 32 bit words.
+
+    state: Array of 4 ints below 2^32 that are not all 0.
+    """
+
+    output = 0.0
+
+    for part in range(2):
+        t = state[0] ^ ((state[0] << 11) & 0xFFFFFFFF)
+        state[0] = state[1]
+        state[1] = state[2]
+        state[2] = state[3]
+        state[3] = state[3] ^ (state[3] >> 19) ^ (t ^ (t >> 8))
+
+        # 27 bits from the first word and 26 bits from the second word
+        if part == 0:
+            output = (state[3] >> 5) * 67108864.0
+        else:
+            output = (output + (state[3] >> 6)) / 9007199254740992.0
+
+    return output
+
+
+
+@compile_kernel
+def run_day_kernel(state, item_costs, item_weights, item_tag_masks, stock, customer_tag_masks, customer_money, customer_buy_attempts, customer_using_credit,
+                   start_minute, end_minute, action_interval_minutes, look_chance, buy_chance, customer_enter_chance, customer_enter_max,
+                   draw_order, in_store, event_types, event_customers, event_rows, event_minutes) -> tuple:
+    """
+    Runs the customer decisions of one day, following StoreSimulator.simulate_one_day with a customer list, and returns a tuple of the number of events written and the number of customer actions.
+
+    Customers enter, buy, and leave in the order of the events. Customers still in the store when it closes are not given leave events.
+
+    stock, customer_money, and customer_buy_attempts are changed in place. draw_order must hold 0 to the number of customers - 1, and in_store is scratch space of the same length.
+
+    The event arrays must have room for every enter, buy, and leave of the day. The event minute array ends with the minute that the store closed.
+    """
+
+    item_count = len(item_costs)
+    remaining = len(customer_tag_masks)
+    in_store_count = 0
+    event_count = 0
+    action_count = 0
+
+    # Allows customers to enter at the start minute
+    minute = start_minute - action_interval_minutes
+
+    while(True):
+        minute = minute + action_interval_minutes
+
+        # Store closes
+        if minute >= end_minute:
+            break
+
+        # Customer actions, customers that stay are moved to the front of in_store in the same order
+        staying_count = 0
+        action_count += in_store_count
+
+        for position in range(in_store_count):
+            customer = in_store[position]
+            leaves = False
+
+            if customer_buy_attempts[customer] > 0:
+                choice = next_random(state)
+
+                if choice < look_chance:
+                    # Customer does nothing
+                    customer_buy_attempts[customer] -= 0.2
+                elif choice < buy_chance + look_chance:
+                    # Customer tries to buy something, items are weighted like the potential buys list
+                    customer_mask = customer_tag_masks[customer]
+                    total_weight = 0
+
+                    for row_index in range(item_count):
+                        if (item_tag_masks[row_index] & customer_mask) != 0 and stock[row_index] > 0:
+                            total_weight += item_weights[row_index]
+
+                    if total_weight <= 0:
+                        leaves = True
+                    else:
+                        pick = int(next_random(state) * total_weight)
+                        row_index = 0
+
+                        while(True):
+                            if (item_tag_masks[row_index] & customer_mask) != 0 and stock[row_index] > 0 and item_weights[row_index] > 0:
+                                if pick < item_weights[row_index]:
+                                    break
+                                pick -= item_weights[row_index]
+                            row_index += 1
+
+                        customer_buy_attempts[customer] -= 1
+
+                        if item_costs[row_index] <= customer_money[customer] or customer_using_credit[customer]:
+                            customer_money[customer] -= item_costs[row_index]
+                            stock[row_index] -= 1
+
+                            event_types[event_count] = 1
+                            event_customers[event_count] = customer
+                            event_rows[event_count] = row_index
+                            event_minutes[event_count] = minute
+                            event_count += 1
+                else:
+                    # Customer decides to leave
+                    leaves = True
+            else:
+                # Customer leaves as they want nothing else
+                leaves = True
+
+            if leaves:
+                event_types[event_count] = 2
+                event_customers[event_count] = customer
+                event_rows[event_count] = -1
+                event_minutes[event_count] = minute
+                event_count += 1
+            else:
+                in_store[staying_count] = customer
+                staying_count += 1
+
+        in_store_count = staying_count
+
+        # Check if customers enter
+        if next_random(state) < customer_enter_chance:
+            enter_count = 1 + int(next_random(state) * customer_enter_max)
+
+            if remaining > enter_count:
+                # Draw customers without putting them back
+                while(enter_count > 0):
+                    position = int(next_random(state) * remaining)
+                    customer = draw_order[position]
+                    draw_order[position] = draw_order[remaining - 1]
+                    remaining -= 1
+                    enter_count -= 1
+
+                    in_store[in_store_count] = customer
+                    in_store_count += 1
+
+                    event_types[event_count] = 0
+                    event_customers[event_count] = customer
+                    event_rows[event_count] = -1
+                    event_minutes[event_count] = minute
+                    event_count += 1
+            else:
+                # Add the rest of the customers
+                while(remaining > 0):
+                    customer = draw_order[remaining - 1]
+                    remaining -= 1
+
+                    in_store[in_store_count] = customer
+                    in_store_count += 1
+
+                    event_types[event_count] = 0
+                    event_customers[event_count] = customer
+                    event_rows[event_count] = -1
+                    event_minutes[event_count] = minute
+                    event_count += 1
+
+    event_minutes[len(event_minutes) - 1] = minute
+
+    return event_count, action_count
+
+
+
+class DayKernel:
+
+
+
+    def __init__(self, store: sim.StoreSimulator, seed: int = None):
+        """
+        Initializes a Day Kernel object, which simulates a store's days with the kernel run_day_kernel. The kernel is compiled with numba if it is installed.
+
+        The kernel has its own random numbers, so a seed gives the same transactions and stock with or without numba, but not the same as StoreSimulator.simulate_one_day.
+
+        store: Store Simulator object that is simulated. Its stock, transactions, sales analytics, and histories are updated like a normal day.
+
+        seed: Seed for the kernel's random numbers. A random seed is used if None.
+        """
+
+        if len(store.tag_codes) > MAX_TAGS:
+            raise ValueError("The day kernel supports at most " + str(MAX_TAGS) + " tags, the item list has " + str(len(store.tag_codes)) + ".")
+
+        self.store = store
+
+        if seed is None:
+            seed = rand.getrandbits(64)
+
+        self.state = self.__make_array("q", DayKernel.seed_state(seed))
+
+
+
+    @staticmethod
+    def seed_state(seed: int) -> list:
+        """
+        Returns the 4 words of random number generator state made from a seed with splitmix64.
+        """
+
+        output = []
+        value = seed & SPLITMIX_MASK
+
+        while(len(output) < 4):
+            value = (value + 0x9E3779B97F4A7C15) & SPLITMIX_MASK
+            mixed = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & SPLITMIX_MASK
+            mixed = ((mixed ^ (mixed >> 27)) * 0x94D049BB133111EB) & SPLITMIX_MASK
+            mixed = mixed ^ (mixed >> 31)
+
+            output.append(mixed & WORD_MASK)
+
+        # xorshift128 can not start from all 0
+        if max(output) == 0:
+            output[0] = 1
+
+        return output
+
+
+
+    def simulate_one_day(self, customer_list: list, customer_enter_chance: float = 0.1, customer_enter_max: int = 3) -> int:
+        """
+        Simulates one day of operation for the store and returns the number of events, like StoreSimulator.simulate_one_day with use_random_customers off.
+
+        The decisions of the whole day are made by the kernel, then the enters, buys, and leaves are applied to the store in order.
+
+        customer_list: List of specific customers that can enter the store. The list is not changed, and names should be unique.
+
+        customer_enter_chance: The chance that a customer enters the store at every action interval.
+
+        customer_enter_max: The max amount of customers that can enter the store at any action interval.
+        """
+
+        store = self.store
+
+        # The kernel only knows the item list costs
+        if store.price_schedule is not None:
+            raise ValueError("The day kernel does not support price schedules.")
+
+        store.start_new_day()
+
+        if not store.quiet:
+            print("Store: " + store.store_name + " Day " + str(store.day) + " begins.\n")
+
+        catalog = store.get_catalog_arrays()
+        customer_count = len(customer_list)
+
+        # Customers start the day reset, with tags encoded by the store
+        customer_tag_masks = []
+        for customer in customer_list:
+            if customer.tag_codes is not store.tag_codes:
+                customer.set_tag_mask(store.encode_tags(customer.item_tags), store.tag_codes)
+            customer_tag_masks.append(customer.tag_mask)
+
+        customer_money = self.__make_array("d", [customer.starting_money for customer in customer_list])
+        customer_buy_attempts = self.__make_array("d", [customer.starting_buy_attempts for customer in customer_list])
+
+        # Every customer enters and leaves at most once, and buys at most once per whole buy attempt
+        event_capacity = 2 * customer_count + sum(math.ceil(max(0, customer.starting_buy_attempts)) for customer in customer_list) + 1
+
+        event_types = self.__make_array("q", [0] * event_capacity)
+        event_customers = self.__make_array("q", [0] * event_capacity)
+        event_rows = self.__make_array("q", [0] * event_capacity)
+        event_minutes = self.__make_array("d", [0] * event_capacity)
+
+        event_count, action_count = run_day_kernel(self.state, self.__make_array("d", catalog["Cost (USD)"]), self.__make_array("q", catalog["Weight"]), self.__make_array("q", catalog["Tag Mask"]),
+                                     self.__make_array("q", catalog["Stock"]), self.__make_array("q", customer_tag_masks), customer_money, customer_buy_attempts,
+                                     self.__make_array("b", [customer.using_credit for customer in customer_list]),
+                                     float(store.start_hour * 60), float(store.end_hour * 60), float(store.action_interval_minutes),
+                                     store.look_chance, store.buy_chance, customer_enter_chance, customer_enter_max,
+                                     self.__make_array("q", range(customer_count)), self.__make_array("q", [0] * customer_count),
+                                     event_types, event_customers, event_rows, event_minutes)
+
+        item_ids = catalog["Item Id"]
+
+        # Customer index to the customer object that entered the store
+        entered = {}
+
+        # Apply the events to the store
+        for event in range(event_count):
+            customer_index = event_customers[event]
+            store.current_minute = float(event_minutes[event])
+
+            if event_types[event] == ENTER_EVENT:
+                entered[customer_index] = store.customer_enters(customer_list[customer_index])
+            elif event_types[event] == BUY_EVENT:
+                store.public_customer_buys(entered[customer_index], item_ids[event_rows[event]])
+            else:
+                store.public_customer_leaves(entered[customer_index])
+
+        # Looks and refused buys only change buy attempts
+        for customer_index, customer in entered.items():
+            customer.max_buy_attempts = customer_buy_attempts[customer_index]
+
+        # The kernel's intervals are not run by the store, so the whole day is added to the metrics at once
+        if store.metrics_exporter is not None:
+            store.metrics_exporter.record_interval(store.store_name, float(event_minutes[event_capacity - 1]) - store.start_hour * 60, action_count, len(store.purchase_log), len(store.customers_in_store))
+
+        # Close the store at the same minute as the kernel
+        store.current_minute = float(event_minutes[event_capacity - 1]) - store.action_interval_minutes
+        store.do_action_interval()
+
+        if not store.quiet:
+            print("\nStore: " + store.store_name + " Day " + str(store.day) + " ends.")
+
+        return event_count
+
+
+
+    def __make_array(self, typecode: str, values):
+        """
+        Returns an array of the values, as a numpy array when the kernel is compiled.
+        """
+
+        if np is not None:
+            return np.array(values, dtype={"q": np.int64, "d": np.float64, "b": np.bool_}[typecode])
+
+        return array(typecode, values)
+
+
+
+def compare_engines(item_count: int = 2000, customer_count: int = 5000, customer_enter_chance: float = 0.9, customer_enter_max: int = 20, seed: int = 1) -> dict:
+    """
+    Returns a dict of the seconds taken to simulate the same day with StoreSimulator.simulate_one_day and with the day kernel, along with the sales of each.
+
+    Uses a synthetic item list written by Benchmark.write_synthetic_item_list.
+    """
+
+    import os
+    import tempfile
+    import Benchmark as bm
+
+    with tempfile.TemporaryDirectory() as directory:
+        item_list_path = os.path.join(directory, "Items.csv")
+        bm.write_synthetic_item_list(item_list_path, item_count, 30)
+
+        output = {"Compiled": COMPILED}
+
+        for engine in ["Exact", "Kernel"]:
+            rand.seed(seed)
+
+            store = sim.StoreSimulator(item_list_path, 9, 17, 5, False, "Kernel Compare")
+            store.quiet = True
+            customer_list = store.create_random_customer_list(customer_count)
+
+            start = time.perf_counter()
+
+            if engine == "Exact":
+                store.simulate_one_day(customer_list, False, customer_enter_chance, customer_enter_max)
+            else:
+                kernel = DayKernel(store, seed)
+
+                # The first day compiles the kernel, so it is run on a copy of the store and not timed
+                if COMPILED:
+                    warm_store = sim.StoreSimulator(item_list_path, 9, 17, 5, False, "Kernel Compare")
+                    warm_store.quiet = True
+                    DayKernel(warm_store, seed).simulate_one_day(customer_list[:10], customer_enter_chance, customer_enter_max)
+                    start = time.perf_counter()
+
+                kernel.simulate_one_day(customer_list, customer_enter_chance, customer_enter_max)
+
+            output[engine + " Seconds"] = round(time.perf_counter() - start, 3)
+            output[engine + " Units Sold"] = sum(store.sales_analytics.day_units)
+            output[engine + " Transactions"] = len(store.customer_transactions)
+
+    return output
+
+
+
+if __name__ == "__main__":
+    print(compare_engines())
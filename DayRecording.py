@@ -0,0 +1,135 @@
+from array import array
+
+class DayRecording:
+    # Kinds of events
+    ENTER = 0
+    LEAVE = 1
+    BUY = 2
+    REFUSED_BUY = 3
+    EMPTY_BUY = 4
+
+
+    def __init__(self, item_ids: list, opening_stock: array):
+        """
+        Initializes a Day Recording object, which holds the decisions of one simulated day so it can be replayed with different stock or prices.
+
+        Looks are not recorded, as they only lower buy attempts and a customer's buy attempts do not depend on stock. Each event is an enter, a leave, or a buy of the row of the chosen item, which is a refused buy if the customer could not pay for it.
+
+        item_ids: Item id of each row of the store's item list.
+
+        opening_stock: Stock of each row when the day started.
+        """
+
+        self.item_ids = list(item_ids)
+        self.opening_stock = array("q", opening_stock)
+
+        # Customers in the order they first entered, events refer to them by index
+        self.customers = []
+        self.customer_indices = {}
+
+        # One value per event in the order they happened
+        self.event_minutes = array("d")
+        self.event_customers = array("q")
+        self.event_kinds = array("b")
+
+        # Row of the chosen item of a buy, -1 for other events
+        self.event_rows = array("q")
+
+        # Buy attempts of the customer before the event
+        self.event_attempts = array("d")
+
+        # Set by finish
+        self.final_attempts = array("d")
+        self.close_minute = None
+        self.day = None
+
+        # Compiled price array of each action interval of the day, None if the store had no price schedule
+        self.day_prices = None
+
+
+
+    def add_event(self, minute: float, customer: "Customer", kind: int, row_index: int = -1, buy_attempts: float = None):
+        """
+        Adds an event of a customer. This should only be called by a Store Simulator object.
+
+        kind: ENTER, LEAVE, EMPTY_BUY, BUY, or REFUSED_BUY.
+
+        row_index: Row of the chosen item of a buy.
+
+        buy_attempts: Buy attempts of the customer before the event. Uses the customer's current buy attempts if None.
+        """
+
+        key = id(customer)
+
+        if key not in self.customer_indices:
+            self.customer_indices[key] = len(self.customers)
+            self.customers.append(customer)
+
+        self.event_minutes.append(minute)
+        self.event_customers.append(self.customer_indices[key])
+        self.event_kinds.append(kind)
+        self.event_rows.append(row_index)
+        self.event_attempts.append(customer.max_buy_attempts if buy_attempts is None else buy_attempts)
+
+
+
+    def finish(self, close_minute: float, day: int, day_prices: list = None):
+        """
+        Records the end of the day. This should only be called by a Store Simulator object.
+
+        close_minute: Minute that the store closed.
+
+        day: Day that was recorded.
+
+        day_prices: Compiled price array of each action interval of the day, None if the store had no price schedule.
+        """
+
+        self.close_minute = close_minute
+        self.day = day
+        self.day_prices = None if day_prices is None else list(day_prices)
+        self.final_attempts = array("d", [customer.max_buy_attempts for customer in self.customers])
+
+
+
+    def get_event_count(self) -> int:
+        """
+        Returns the number of recorded events.
+        """
+
+        return len(self.event_kinds)
+
+
+
+def check_replay(item_list_path: str = "ItemList.csv", seed: int = 0, customer_count: int = 100, customer_enter_chance: float = 0.3, customer_enter_max: int = 3) -> dict:
+    """
+    Returns a dict of whether replaying a recorded day with no overrides gives the same transactions, stock, and income as the recorded day. The store has a promotion on its first day only, so the replay has to use the recorded day's prices.
+
+    The replay is run on a fork, so the recorded store is not changed by it.
+    """
+
+    import random as rand
+    import PriceSchedule as ps
+    import StoreSimulator as sim
+
+    rand.seed(seed)
+
+    store = sim.StoreSimulator(item_list_path, 9, 17, 5, False, "Replay Check")
+    store.quiet = True
+    store.price_schedule = ps.PriceSchedule([{"type": "promotion", "discount": 0.5, "first_day": 1, "last_day": 1}])
+
+    customer_list = store.create_random_customer_list(customer_count)
+    recording = store.record_one_day(customer_list, False, customer_enter_chance, customer_enter_max)
+
+    replay = store.fork(seed)
+    replay.replay_day(recording)
+
+    # Transaction ids count on from the recorded day, so they are left out
+    return {"Events": recording.get_event_count(),
+            "Same Transactions": [row[1:] for row in replay.customer_transactions] == [row[1:] for row in store.customer_transactions],
+            "Same Stock": list(replay.get_catalog_arrays()["Stock"]) == list(store.get_catalog_arrays()["Stock"]),
+            "Same Income": replay.get_income_for_current_day() == store.get_income_for_current_day()}
+
+
+
+if __name__ == "__main__":
+    print(check_replay())
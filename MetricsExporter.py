@@ -0,0 +1,303 @@
+import os
+import sys
+import time
+import atexit
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# resource is only on unix, memory metrics are left out without it
+try:
+    import resource
+except ImportError:
+    resource = None
+
+class MetricsExporter:
+    # Name, type, and help text of each counter kept per store
+    STORE_METRICS = [
+        ("store_simulator_simulated_minutes_total", "counter", "Simulated minutes run by the store."),
+        ("store_simulator_customer_actions_total", "counter", "Customer actions run by the store."),
+        ("store_simulator_purchases_total", "counter", "Items bought in the store."),
+        ("store_simulator_days_total", "counter", "Days completed by the store."),
+        ("store_simulator_transactions_total", "counter", "Customers that left the store."),
+        ("store_simulator_customers_in_store", "gauge", "Customers in the store after the last action interval."),
+        ("store_simulator_simulated_minutes_per_second", "gauge", "Simulated minutes per second of wall time over the last sample."),
+        ("store_simulator_customer_actions_per_second", "gauge", "Customer actions per second of wall time over the last sample."),
+    ]
+
+    # Index of each value in a store's list of metric values
+    MINUTES = 0
+    ACTIONS = 1
+    PURCHASES = 2
+    DAYS = 3
+    TRANSACTIONS = 4
+    CUSTOMERS_IN_STORE = 5
+    MINUTES_RATE = 6
+    ACTIONS_RATE = 7
+
+
+    def __init__(self, textfile_path: str = None, http_port: int = None, sample_seconds: float = 5.0, http_host: str = "127.0.0.1"):
+        """
+        Initializes a Metrics Exporter object, which shows the progress of running stores in the Prometheus text format.
+
+        Stores with this object as their metrics_exporter add to its counters once per action interval. Every sample_seconds, rates are worked out on a background thread and the textfile is rewritten.
+
+        textfile_path: Path of a file that the metrics are written to, such as one read by the node exporter's textfile collector. Not written if None.
+
+        http_port: Port that the metrics are served on at "/metrics". Not served if None. Port 0 picks a free port, see http_port.
+
+        sample_seconds: Seconds between samples.
+
+        http_host: Address that the metrics are served on.
+        """
+
+        self.textfile_path = textfile_path
+        self.sample_seconds = sample_seconds
+
+        # Store name to list of metric values, see STORE_METRICS
+        self.store_values = {}
+
+        # Store name to (time, minutes, actions) of the last sample
+        self.last_samples = {}
+
+        self.start_time = time.monotonic()
+        self.lock = threading.Lock()
+
+        self.__stop = threading.Event()
+
+        self.__server = None
+        self.http_port = None
+
+        if http_port is not None:
+            exporter = self
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+
+
+                def do_GET(self):
+                    if self.path.split("?")[0] != "/metrics":
+                        self.send_error(404)
+                        return
+
+                    body = exporter.format_metrics().encode("utf-8")
+
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+
+                def log_message(self, format, *args):
+                    # Requests are not printed to the console
+                    pass
+
+            self.__server = ThreadingHTTPServer((http_host, http_port), MetricsHandler)
+            self.__server.daemon_threads = True
+            self.http_port = self.__server.server_address[1]
+
+            threading.Thread(target=self.__server.serve_forever, name="Metrics Server", daemon=True).start()
+
+        self.__thread = threading.Thread(target=self.__run, name="Metrics Sampler", daemon=True)
+        self.__thread.start()
+
+        # The textfile gets the final counters before the program exits
+        atexit.register(self.close)
+
+
+
+    def record_interval(self, store_name: str, minutes: float, actions: int, purchases: int, customers_in_store: int):
+        """
+        Adds an action interval of a store to the counters. This should only be called by a Store Simulator object.
+
+        minutes: Simulated minutes of the interval.
+
+        actions: Customer actions run during the interval.
+
+        purchases: Items bought during the interval.
+
+        customers_in_store: Customers in the store after the interval.
+        """
+
+        with self.lock:
+            values = self.__get_values(store_name)
+
+            values[MetricsExporter.MINUTES] += minutes
+            values[MetricsExporter.ACTIONS] += actions
+            values[MetricsExporter.PURCHASES] += purchases
+            values[MetricsExporter.CUSTOMERS_IN_STORE] = customers_in_store
+
+
+
+    def record_day(self, store_name: str, transactions: int):
+        """
+        Adds a completed day of a store to the counters. This should only be called by a Store Simulator object.
+
+        transactions: Number of customers that left the store during the day.
+        """
+
+        with self.lock:
+            values = self.__get_values(store_name)
+
+            values[MetricsExporter.DAYS] += 1
+            values[MetricsExporter.TRANSACTIONS] += transactions
+            values[MetricsExporter.CUSTOMERS_IN_STORE] = 0
+
+
+
+    def sample(self):
+        """
+        Works out the per second rates of each store since the last sample and rewrites the textfile. Called by the background thread.
+        """
+
+        now = time.monotonic()
+
+        with self.lock:
+            for store_name, values in self.store_values.items():
+                last_time, last_minutes, last_actions = self.last_samples.get(store_name, (self.start_time, 0, 0))
+
+                if now > last_time:
+                    values[MetricsExporter.MINUTES_RATE] = (values[MetricsExporter.MINUTES] - last_minutes) / (now - last_time)
+                    values[MetricsExporter.ACTIONS_RATE] = (values[MetricsExporter.ACTIONS] - last_actions) / (now - last_time)
+
+                self.last_samples[store_name] = (now, values[MetricsExporter.MINUTES], values[MetricsExporter.ACTIONS])
+
+        if self.textfile_path is not None:
+            self.write_textfile()
+
+
+
+    def format_metrics(self) -> str:
+        """
+        Returns the metrics in the Prometheus text format.
+        """
+
+        lines = []
+
+        with self.lock:
+            rows = [(store_name, list(values)) for store_name, values in self.store_values.items()]
+
+        for metric_index, (name, metric_type, help_text) in enumerate(MetricsExporter.STORE_METRICS):
+            lines.append("# HELP " + name + " " + help_text)
+            lines.append("# TYPE " + name + " " + metric_type)
+
+            for store_name, values in rows:
+                lines.append(name + "{store=\"" + self.__escape_label(store_name) + "\"} " + self.__format_value(values[metric_index]))
+
+        # Memory of the whole process
+        for name, help_text, value in self.get_memory_metrics():
+            lines.append("# HELP " + name + " " + help_text)
+            lines.append("# TYPE " + name + " gauge")
+            lines.append(name + " " + self.__format_value(value))
+
+        lines.append("# HELP store_simulator_uptime_seconds Seconds since the exporter was made.")
+        lines.append("# TYPE store_simulator_uptime_seconds gauge")
+        lines.append("store_simulator_uptime_seconds " + self.__format_value(time.monotonic() - self.start_time))
+
+        return "\n".join(lines) + "\n"
+
+
+
+    def get_memory_metrics(self) -> list:
+        """
+        Returns a list of (name, help text, bytes) for the memory use of the process. Metrics that can not be read on this system are left out.
+        """
+
+        output = []
+
+        # Current resident memory, only on systems with /proc
+        try:
+            with open("/proc/self/statm") as statm_file:
+                resident_pages = int(statm_file.read().split()[1])
+            output.append(("store_simulator_resident_memory_bytes", "Resident memory of the process.", resident_pages * os.sysconf("SC_PAGE_SIZE")))
+        except (OSError, ValueError, IndexError, AttributeError):
+            pass
+
+        if resource is not None:
+            max_resident = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+            # Linux gives kilobytes and macOS gives bytes
+            if sys.platform != "darwin":
+                max_resident = max_resident * 1024
+
+            output.append(("store_simulator_max_resident_memory_bytes", "Peak resident memory of the process.", max_resident))
+
+        return output
+
+
+
+    def write_textfile(self):
+        """
+        Writes the metrics to textfile_path. The file is replaced in one step, so readers never see half of a file.
+        """
+
+        temp_path = self.textfile_path + ".tmp"
+
+        with open(temp_path, "w") as metrics_file:
+            metrics_file.write(self.format_metrics())
+
+        os.replace(temp_path, self.textfile_path)
+
+
+
+    def close(self):
+        """
+        Takes a final sample, stops the background thread, and stops serving metrics. Safe to call more than once.
+        """
+
+        if self.__stop.is_set():
+            return
+
+        self.__stop.set()
+        self.__thread.join()
+
+        self.sample()
+
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+
+        atexit.unregister(self.close)
+
+
+
+    def __run(self):
+        """
+        Takes a sample every sample_seconds until close is called.
+        """
+
+        while(not self.__stop.wait(self.sample_seconds)):
+            self.sample()
+
+
+
+    def __get_values(self, store_name: str) -> list:
+        """
+        Returns the list of metric values of a store, adding one if the store is new. The lock must be held.
+        """
+
+        if store_name not in self.store_values:
+            self.store_values[store_name] = [0] * len(MetricsExporter.STORE_METRICS)
+
+        return self.store_values[store_name]
+
+
+
+    def __escape_label(self, value: str) -> str:
+        """
+        Returns a label value with backslashes, quotes, and new lines escaped.
+        """
+
+        return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+
+    def __format_value(self, value) -> str:
+        """
+        Returns a metric value as a string.
+        """
+
+        if isinstance(value, float):
+            return repr(round(value, 6))
+
+        return str(value)
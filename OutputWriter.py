@@ -0,0 +1,118 @@
+import os
+import csv
+import queue
+import atexit
+import threading
+
+class OutputWriter:
+
+
+
+    def __init__(self, max_pending: int = 0):
+        """
+        Initializes an Output Writer object, which writes csv files on a background thread so a simulation can continue while files are written.
+
+        max_pending: Max number of files waiting to be written before write_csv blocks. 0 means there is no max.
+        """
+
+        self.__queue = queue.Queue(max_pending)
+
+        # First error raised by the background thread, raised again by flush
+        self.__error = None
+
+        self.__closed = False
+
+        self.__thread = threading.Thread(target=self.__run, name="Output Writer", daemon=True)
+        self.__thread.start()
+
+        # Files that are still waiting are written before the program exits
+        atexit.register(self.close)
+
+
+
+    def write_csv(self, output_file_path: str, columns: list, rows, append: bool = False):
+        """
+        Queues a csv file to be made or overwritten with a header row of columns followed by the rows.
+
+        rows: A list of rows, or a function that returns a list of rows. A function is called on the background thread, so it should only use data that will not change.
+
+        append: Adds the rows to the end of the file instead. The header row is only written if the file is new.
+        """
+
+        if self.__closed:
+            raise ValueError("Output writer is closed.")
+
+        self.__queue.put((output_file_path, columns, rows, append))
+
+
+
+    def flush(self):
+        """
+        Waits until every queued file is written. Raises the first error from the background thread, if any.
+        """
+
+        self.__queue.join()
+
+        if self.__error is not None:
+            error = self.__error
+            self.__error = None
+            raise error
+
+
+
+    def close(self):
+        """
+        Writes every queued file and stops the background thread. Safe to call more than once.
+        """
+
+        if self.__closed:
+            return
+
+        self.__closed = True
+
+        # None tells the background thread to stop
+        self.__queue.put(None)
+        self.__thread.join()
+
+        atexit.unregister(self.close)
+
+        if self.__error is not None:
+            error = self.__error
+            self.__error = None
+            raise error
+
+
+
+    def __run(self):
+        """
+        Writes queued files until None is taken from the queue.
+        """
+
+        while(True):
+            task = self.__queue.get()
+
+            if task is None:
+                self.__queue.task_done()
+                return
+
+            output_file_path, columns, rows, append = task
+
+            try:
+                if callable(rows):
+                    rows = rows()
+
+                write_header = not append or not os.path.exists(output_file_path) or os.path.getsize(output_file_path) == 0
+
+                with open(output_file_path, "a" if append else "w", newline="") as output_file:
+                    writer = csv.writer(output_file, lineterminator=os.linesep)
+                    if write_header:
+                        writer.writerow(columns)
+                    writer.writerows(rows)
+            except Exception as error:
+                if self.__error is None:
+                    self.__error = error
+            finally:
+                self.__queue.task_done()
+
+            del task
+            del rows
@@ -0,0 +1,193 @@
+import os
+import json
+import hashlib
+import itertools
+
+import random as rand
+import StoreSimulator as sim
+
+from concurrent.futures import ProcessPoolExecutor
+
+# Parameters that can be given in a parameter grid and their default values
+DEFAULT_PARAMETERS = {
+    "look_chance": sim.StoreSimulator.LOOK_CHANCE,
+    "buy_chance": sim.StoreSimulator.BUY_CHANCE,
+    "leave_chance": None,
+    "action_interval_minutes": 5,
+    "customer_enter_chance": 0.1,
+    "customer_enter_max": 3,
+}
+
+# Used to create a directory for cached sweep results
+CACHE_DIR_NAME = os.path.join(sim.StoreSimulator.OUTPUT_DIR_NAME, "Parameter Sweep Cache")
+
+def expand_parameter_grid(parameter_grid: dict) -> list:
+    """
+    Returns a list of dicts with every combination of the values in the parameter grid.
+
+    parameter_grid: Dict of parameter name to a list of values. See DEFAULT_PARAMETERS for the names that can be used.
+    """
+
+    for name in parameter_grid:
+        if name not in DEFAULT_PARAMETERS:
+            raise ValueError("Unknown parameter '" + name + "'. Parameters must be one of: " + ", ".join(DEFAULT_PARAMETERS) + ".")
+
+    names = list(parameter_grid)
+    output = []
+
+    for values in itertools.product(*[parameter_grid[name] for name in names]):
+        parameters = DEFAULT_PARAMETERS.copy()
+        parameters.update(zip(names, values))
+
+        # Customers leave with whatever chance is left over unless it was given
+        if parameters["leave_chance"] is None:
+            parameters["leave_chance"] = round(1 - parameters["look_chance"] - parameters["buy_chance"], 10)
+
+        output.append(parameters)
+
+    return output
+
+
+
+def hash_item_list(item_list_path: str) -> str:
+    """
+    Returns a sha256 hash of the contents of an item list csv.
+    """
+
+    with open(item_list_path, "rb") as item_file:
+        return hashlib.sha256(item_file.read()).hexdigest()
+
+
+
+def get_cache_key(parameters: dict, seed: int, item_list_hash: str, settings: dict) -> str:
+    """
+    Returns the name that a sweep result is cached under.
+
+    settings: Values that are the same for every point of a sweep, such as the number of days.
+    """
+
+    key_data = json.dumps({"parameters": parameters, "seed": seed, "item list": item_list_hash, "settings": settings}, sort_keys=True)
+
+    return hashlib.sha256(key_data.encode()).hexdigest()
+
+
+
+def simulate_point(item_list_path: str, parameters: dict, seed: int, settings: dict) -> dict:
+    """
+    Simulates one point of a sweep and returns a dict of its results. This is run in a worker process.
+
+    item_list_path: Path to the item list used by the store.
+
+    parameters: Dict of every name in DEFAULT_PARAMETERS to a value.
+
+    seed: Seed for the random module.
+
+    settings: Dict with "days", "customer_count", "start_hour", and "end_hour".
+    """
+
+    rand.seed(seed)
+
+    store = sim.StoreSimulator(item_list_path, settings["start_hour"], settings["end_hour"], parameters["action_interval_minutes"], False, "Parameter Sweep")
+    store.quiet = True
+    store.set_action_chances(parameters["look_chance"], parameters["buy_chance"], parameters["leave_chance"])
+
+    customer_list = store.create_random_customer_list(settings["customer_count"])
+
+    daily_income = []
+    daily_transactions = []
+
+    for _ in range(settings["days"]):
+        store.simulate_one_day(customer_list, False, parameters["customer_enter_chance"], parameters["customer_enter_max"])
+
+        daily_income.append(store.get_income_for_current_day())
+        daily_transactions.append(len(store.customer_transactions))
+
+    analytics = store.sales_analytics
+
+    return {
+        "parameters": parameters,
+        "seed": seed,
+        "daily_income": daily_income,
+        "daily_transactions": daily_transactions,
+        "units_sold": sum(analytics.total_units),
+        "ending_stock": {str(item_id): int(store.get_stock(item_id)) for item_id in analytics.item_ids},
+    }
+
+
+
+def run_parameter_sweep(item_list_path: str, parameter_grid: dict, seeds: list = [0], days: int = 1, customer_count: int = 100, start_hour: float = 9, end_hour: float = 18,
+                        processes: int = None, cache_dir: str = CACHE_DIR_NAME) -> list:
+    """
+    Simulates every combination of the parameter grid for each seed and returns a list of result dicts in grid order.
+
+    Points are run in parallel worker processes. Each finished point is saved in cache_dir, keyed by its parameters, seed, settings, and the item list contents, so running the same sweep again only simulates points that are missing.
+
+    item_list_path: Path to the item list used by the store.
+
+    parameter_grid: Dict of parameter name to a list of values. See DEFAULT_PARAMETERS for the names that can be used.
+
+    seeds: Seeds that every combination is run with.
+
+    days: Number of days simulated for each point.
+
+    customer_count: Number of random customers that each point's store has.
+
+    processes: Max number of worker processes. Uses the CPU count if None.
+
+    cache_dir: Directory for cached results. Caching is turned off if None.
+    """
+
+    settings = {"days": days, "customer_count": customer_count, "start_hour": start_hour, "end_hour": end_hour}
+    item_list_hash = hash_item_list(item_list_path)
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    results = []
+    missing = []
+
+    # Load cached points and find the ones that still need to be simulated
+    for parameters in expand_parameter_grid(parameter_grid):
+        for seed in seeds:
+            cache_path = None
+
+            if cache_dir is not None:
+                cache_path = os.path.join(cache_dir, get_cache_key(parameters, seed, item_list_hash, settings) + ".json")
+
+                if os.path.exists(cache_path):
+                    with open(cache_path) as cache_file:
+                        results.append(json.load(cache_file))
+                    continue
+
+            missing.append((len(results), parameters, seed, cache_path))
+            results.append(None)
+
+    if len(missing) == 0:
+        return results
+
+    with ProcessPoolExecutor(processes) as executor:
+        futures = [(index, cache_path, executor.submit(simulate_point, item_list_path, parameters, seed, settings)) for index, parameters, seed, cache_path in missing]
+
+        for index, cache_path, future in futures:
+            results[index] = future.result()
+
+            if cache_path is not None:
+                # Write to a temporary file first so an interrupted sweep never leaves a partial result
+                temp_path = cache_path + ".tmp"
+
+                with open(temp_path, "w") as cache_file:
+                    json.dump(results[index], cache_file)
+
+                os.replace(temp_path, cache_path)
+
+    return results
+
+
+
+if __name__ == "__main__":
+    print("Parameter Sweep Testing\n")
+
+    sweep_results = run_parameter_sweep("ItemList.csv", {"look_chance": [0.5, 0.55, 0.6], "customer_enter_chance": [0.1, 0.3]}, seeds=[0, 1], days=2)
+
+    for result in sweep_results:
+        print(str(result["parameters"]) + " Seed: " + str(result["seed"]) + " Income: " + str(result["daily_income"]))
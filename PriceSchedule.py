@@ -0,0 +1,191 @@
+from array import array
+
+class PriceSchedule:
+    # Kinds of price rules
+    PROMOTION = "promotion"
+    MARKDOWN = "markdown"
+
+
+    def __init__(self, rules: list = []):
+        """
+        Initializes a Price Schedule object, which holds promotions and low stock markdowns and compiles them into the prices of each action interval of a day.
+
+        rules: List of rule dicts to add, see add_rule.
+        """
+
+        self.rules = []
+
+        for rule in rules:
+            self.add_rule(rule)
+
+
+
+    def add_rule(self, rule: dict):
+        """
+        Adds a price rule. Each rule is a dict with:
+            type: "promotion" or "markdown".
+            discount: Fraction taken off the item list cost, such as 0.25. Either discount or price is needed.
+            price: Price that the items are sold at instead.
+            item_ids: Optional list of item ids that the rule is limited to.
+            tags: Optional list of tags, the rule is limited to items with any of them.
+            first_day: Optional first day of the rule.
+            last_day: Optional last day of the rule.
+            every_days: Optional number of days between the days the rule runs. The rule runs on days that are a multiple of it.
+            start_time: Optional time of day the rule starts in the form of XX:XX. Only for promotions.
+            end_time: Optional time of day the rule ends in the form of XX:XX, the rule does not run at the end time. Only for promotions.
+            threshold: Items at or below this stock when the day starts are marked down. Only for markdowns, and needed by them.
+
+        When more than one rule covers an item, the lowest price is used.
+        """
+
+        if rule.get("type") not in (PriceSchedule.PROMOTION, PriceSchedule.MARKDOWN):
+            raise ValueError("Price rule type must be '" + PriceSchedule.PROMOTION + "' or '" + PriceSchedule.MARKDOWN + "'.")
+
+        if ("discount" in rule) == ("price" in rule):
+            raise ValueError("Price rule must have either a discount or a price.")
+
+        if "discount" in rule and not 0 <= rule["discount"] <= 1:
+            raise ValueError("Price rule discount must be between 0 and 1.")
+
+        if rule["type"] == PriceSchedule.MARKDOWN and "threshold" not in rule:
+            raise ValueError("Markdown price rules need a stock threshold.")
+
+        self.rules.append(dict(rule))
+
+
+
+    def add_promotion(self, discount: float = None, price: float = None, item_ids: list = None, tags: list = None, first_day: int = None, last_day: int = None, start_time: str = None, end_time: str = None):
+        """
+        Adds a promotion rule. See add_rule.
+        """
+
+        self.add_rule(self.__make_rule(PriceSchedule.PROMOTION, discount, price, item_ids, tags, first_day, last_day, start_time=start_time, end_time=end_time))
+
+
+
+    def add_markdown(self, threshold: int, discount: float = None, price: float = None, item_ids: list = None, tags: list = None, first_day: int = None, last_day: int = None):
+        """
+        Adds a low stock markdown rule. See add_rule.
+        """
+
+        self.add_rule(self.__make_rule(PriceSchedule.MARKDOWN, discount, price, item_ids, tags, first_day, last_day, threshold=threshold))
+
+
+
+    def compile_day(self, store: "StoreSimulator", day: int) -> list:
+        """
+        Returns a list of price arrays, one per action interval of the store's day, where index 0 is the interval at the opening hour.
+
+        Intervals with the same rules running share one array, so a day without rules is only the item list costs.
+
+        store: Store Simulator object that the item list, stock, and hours are taken from.
+
+        day: Day being compiled.
+        """
+
+        catalog = store.get_catalog_arrays()
+        base_costs = catalog["Cost (USD)"]
+        stock = catalog["Stock"]
+
+        start_minute = store.start_hour * 60
+        interval_count = max(1, -int(-(store.end_hour * 60 - start_minute) // store.action_interval_minutes))
+
+        # Rows and prices of each rule that runs today
+        day_rules = []
+
+        for rule in self.rules:
+            if not self.__runs_on_day(rule, day):
+                continue
+
+            rows = self.__get_rule_rows(store, rule, catalog, stock)
+
+            if "price" in rule:
+                prices = [round(rule["price"], 2)] * len(rows)
+            else:
+                prices = [round(base_costs[row_index] * (1 - rule["discount"]), 2) for row_index in rows]
+
+            # Promotions can be limited to part of the day, markdowns run all day
+            first_interval = 0
+            last_interval = interval_count
+
+            if rule["type"] == PriceSchedule.PROMOTION:
+                if rule.get("start_time") is not None:
+                    first_interval = max(0, -int(-(store.time_to_minutes(rule["start_time"]) - start_minute) // store.action_interval_minutes))
+                if rule.get("end_time") is not None:
+                    last_interval = min(interval_count, -int(-(store.time_to_minutes(rule["end_time"]) - start_minute) // store.action_interval_minutes))
+
+            day_rules.append((rows, prices, first_interval, last_interval))
+
+        # Price array of each set of running rules
+        compiled = {}
+        output = []
+
+        for interval in range(interval_count):
+            running = tuple(rule_index for rule_index, (_, _, first_interval, last_interval) in enumerate(day_rules) if first_interval <= interval < last_interval)
+
+            if running not in compiled:
+                prices = array("d", base_costs)
+
+                for rule_index in running:
+                    rows, rule_prices, _, _ = day_rules[rule_index]
+
+                    for row_index, price in zip(rows, rule_prices):
+                        if price < prices[row_index]:
+                            prices[row_index] = price
+
+                compiled[running] = prices
+
+            output.append(compiled[running])
+
+        return output
+
+
+
+    def __runs_on_day(self, rule: dict, day: int) -> bool:
+        """
+        Returns True if the rule runs on the day.
+        """
+
+        if rule.get("first_day") is not None and day < rule["first_day"]:
+            return False
+
+        if rule.get("last_day") is not None and day > rule["last_day"]:
+            return False
+
+        return day % rule.get("every_days", 1) == 0
+
+
+
+    def __get_rule_rows(self, store: "StoreSimulator", rule: dict, catalog: dict, stock: array) -> list:
+        """
+        Returns a list of the row indices of the item list that the rule covers.
+        """
+
+        item_ids = catalog["Item Id"]
+        rows = range(len(item_ids))
+
+        if rule.get("item_ids") is not None:
+            rule_item_ids = set(rule["item_ids"])
+            rows = [row_index for row_index in rows if item_ids[row_index] in rule_item_ids]
+
+        if rule.get("tags") is not None:
+            rule_mask = store.encode_tags(rule["tags"])
+            tag_masks = catalog["Tag Mask"]
+            rows = [row_index for row_index in rows if tag_masks[row_index] & rule_mask]
+
+        if rule["type"] == PriceSchedule.MARKDOWN:
+            rows = [row_index for row_index in rows if stock[row_index] <= rule["threshold"]]
+
+        return list(rows)
+
+
+
+    def __make_rule(self, rule_type: str, discount: float, price: float, item_ids: list, tags: list, first_day: int, last_day: int, **extra) -> dict:
+        """
+        Returns a rule dict with the settings that are not None.
+        """
+
+        rule = {"type": rule_type, "discount": discount, "price": price, "item_ids": item_ids, "tags": tags, "first_day": first_day, "last_day": last_day}
+        rule.update(extra)
+
+        return {name: value for name, value in rule.items() if value is not None}
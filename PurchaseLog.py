@@ -0,0 +1,199 @@
+import copy
+import threading
+
+from array import array
+
+class PurchaseLog:
+
+
+
+    def __init__(self, item_ids: list = []):
+        """
+        Initializes a Purchase Log object, which records every item bought in a store during a day in growable typed arrays.
+
+        Each customer has a handle and the index of their last purchase (their head), and each purchase links to the customer's purchase before it, so a customer's items can be found without any per customer lists or dicts.
+        Purchases hold the row of their item, and item ids of any type are found from the row when the log is read.
+
+        item_ids: Item id of each row of a store's item list. Ids that are not in it are given a new row when they are bought.
+        """
+
+        # Item id of each row, and row of each item id
+        self.item_ids = list(item_ids)
+        self.item_rows = {item_id: row_index for row_index, item_id in enumerate(self.item_ids)}
+
+        # One value per purchase in the order they were made
+        self.customer_handles = array("q")
+        self.rows = array("q")
+        self.prices = array("d")
+        self.minutes = array("d")
+
+        # Index of the customer's purchase before this one, -1 for their first purchase
+        self.previous = array("q")
+
+        # Name of each customer handle
+        self.customer_names = []
+
+        # Increased by clear, so customers can tell that their handle and head are from an old day
+        self.generation = 0
+
+        # Purchases can be added by several threads in concurrent mode
+        self.lock = threading.Lock()
+
+        # The item rows are copied before a new row is added while they are shared with a copy
+        self.__item_rows_shared = False
+
+
+
+    def __len__(self) -> int:
+        """
+        Returns the number of purchases in the log.
+        """
+
+        return len(self.rows)
+
+
+
+    def add_customer(self, name: str) -> int:
+        """
+        Returns a new customer handle for a customer name.
+        """
+
+        with self.lock:
+            self.customer_names.append(name)
+            return len(self.customer_names) - 1
+
+
+
+    def append(self, customer_handle: int, item_id: int, price: float, minute: float, previous: int) -> int:
+        """
+        Adds a purchase and returns its index, which becomes the customer's head.
+
+        previous: The customer's head before this purchase, -1 if it is their first.
+        """
+
+        with self.lock:
+            row_index = self.item_rows.get(item_id)
+
+            if row_index is None:
+                row_index = self.__add_item(item_id)
+
+            self.customer_handles.append(customer_handle)
+            self.rows.append(row_index)
+            self.prices.append(price)
+            self.minutes.append(minute)
+            self.previous.append(previous)
+
+            return len(self.rows) - 1
+
+
+
+    def extend(self, customer_handles: array, rows: array, prices: array, minutes: array, previous: array):
+        """
+        Adds several purchases at once, in the order they were made. Each purchase is the value at the same index of each array, see append.
+
+        rows: Rows of the log's item ids, which are the rows of the store's item list for a store's log.
+        """
+
+        with self.lock:
+            self.customer_handles.extend(customer_handles)
+            self.rows.extend(rows)
+            self.prices.extend(prices)
+            self.minutes.extend(minutes)
+            self.previous.extend(previous)
+
+
+
+    def clear(self):
+        """
+        Removes every purchase and customer handle. Item rows are kept.
+        """
+
+        with self.lock:
+            self.customer_handles = array("q")
+            self.rows = array("q")
+            self.prices = array("d")
+            self.minutes = array("d")
+            self.previous = array("q")
+            self.customer_names = []
+            self.generation += 1
+
+
+
+    def copy(self) -> "PurchaseLog":
+        """
+        Returns a copy of the log that can be added to without changing this log. Indices, handles, and heads are the same in both, and item rows are shared until either log adds one.
+        """
+
+        with self.lock:
+            output = copy.copy(self)
+            self.__item_rows_shared = True
+
+            output.customer_handles = array("q", self.customer_handles)
+            output.rows = array("q", self.rows)
+            output.prices = array("d", self.prices)
+            output.minutes = array("d", self.minutes)
+            output.previous = array("q", self.previous)
+            output.customer_names = list(self.customer_names)
+
+        output.__item_rows_shared = True
+        output.lock = threading.Lock()
+
+        return output
+
+
+
+    def get_customer_items(self, head: int) -> list:
+        """
+        Returns a list of [item id, number bought, total paid] for each item of a customer, in the order the items were first bought.
+
+        head: Index of the customer's last purchase, -1 if they bought nothing.
+        """
+
+        # Follow the links back to the first purchase
+        indices = []
+
+        while(head >= 0):
+            indices.append(head)
+            head = self.previous[head]
+
+        output = []
+        row_positions = {}
+
+        for index in reversed(indices):
+            row_index = self.rows[index]
+
+            if row_index in row_positions:
+                entry = output[row_positions[row_index]]
+                entry[1] += 1
+                entry[2] += self.prices[index]
+            else:
+                row_positions[row_index] = len(output)
+                output.append([self.item_ids[row_index], 1, self.prices[index]])
+
+        return output
+
+
+
+    def get_rows(self) -> list:
+        """
+        Returns a list of (customer name, item id, price, minute) for each purchase, in the order they were made.
+        """
+
+        return [(self.customer_names[self.customer_handles[index]], self.item_ids[self.rows[index]], self.prices[index], self.minutes[index]) for index in range(len(self.rows))]
+
+
+
+    def __add_item(self, item_id) -> int:
+        """
+        Returns a new row for an item id that is not in the log's item rows. The lock must be held.
+        """
+
+        if self.__item_rows_shared:
+            self.item_ids = list(self.item_ids)
+            self.item_rows = dict(self.item_rows)
+            self.__item_rows_shared = False
+
+        self.item_rows[item_id] = len(self.item_ids)
+        self.item_ids.append(item_id)
+
+        return len(self.item_ids) - 1
@@ -0,0 +1,428 @@
+import copy
+import threading
+
+class SalesAnalytics:
+    # Counter lists that are changed as items are sold or restocked
+    COUNTER_NAMES = ["day_units", "day_revenue", "day_vendor_units", "day_vendor_revenue", "day_tag_units", "day_tag_revenue", "day_opening_stock",
+                     "day_stock_received", "day_first_stock_out", "day_stock_out_minutes", "total_units", "total_revenue", "total_vendor_units", "total_vendor_revenue",
+                     "total_tag_units", "total_tag_revenue", "total_stock_received", "total_stock_out_minutes", "stock_out_days", "out_of_stock_since"]
+
+
+    def __init__(self, item_ids: list, item_vendors: list, item_tags: list):
+        """
+        Initializes a Sales Analytics object. Counters are updated as items are sold, so no query has to scan transactions.
+
+        item_ids: Item id of each row of a store's item list.
+
+        item_vendors: Vendor of each row of a store's item list.
+
+        item_tags: List of tags of each row of a store's item list.
+        """
+
+        self.item_ids = item_ids
+        self.item_count = len(item_ids)
+
+        # Used to find the row of an item id
+        self.item_rows = {item_id: row_index for row_index, item_id in enumerate(item_ids)}
+
+        # Intern vendors and tags so each sale only updates lists
+        self.vendor_names = []
+        self.tag_names = []
+        self.item_vendor_index = []
+        self.item_tag_indices = []
+
+        vendor_codes = {}
+        tag_codes = {}
+
+        for row_index in range(self.item_count):
+            if item_vendors[row_index] not in vendor_codes:
+                vendor_codes[item_vendors[row_index]] = len(self.vendor_names)
+                self.vendor_names.append(item_vendors[row_index])
+
+            self.item_vendor_index.append(vendor_codes[item_vendors[row_index]])
+
+            tag_indices = []
+
+            for tag_str in item_tags[row_index]:
+                if tag_str not in tag_codes:
+                    tag_codes[tag_str] = len(self.tag_names)
+                    self.tag_names.append(tag_str)
+
+                if tag_codes[tag_str] not in tag_indices:
+                    tag_indices.append(tag_codes[tag_str])
+
+            self.item_tag_indices.append(tuple(tag_indices))
+
+        # Counters for the current day
+        self.day_units = [0] * self.item_count
+        self.day_revenue = [0.0] * self.item_count
+        self.day_vendor_units = [0] * len(self.vendor_names)
+        self.day_vendor_revenue = [0.0] * len(self.vendor_names)
+        self.day_tag_units = [0] * len(self.tag_names)
+        self.day_tag_revenue = [0.0] * len(self.tag_names)
+        self.day_opening_stock = [0] * self.item_count
+        self.day_stock_received = [0] * self.item_count
+        self.day_first_stock_out = [None] * self.item_count
+        self.day_stock_out_minutes = [0] * self.item_count
+
+        # Counters across all days, updated together with the day counters
+        self.total_units = [0] * self.item_count
+        self.total_revenue = [0.0] * self.item_count
+        self.total_vendor_units = [0] * len(self.vendor_names)
+        self.total_vendor_revenue = [0.0] * len(self.vendor_names)
+        self.total_tag_units = [0] * len(self.tag_names)
+        self.total_tag_revenue = [0.0] * len(self.tag_names)
+        self.total_stock_received = [0] * self.item_count
+        self.total_stock_out_minutes = [0] * self.item_count
+        self.stock_out_days = [0] * self.item_count
+
+        # Minute that each item has been out of stock since, None if it is in stock
+        self.out_of_stock_since = [None] * self.item_count
+
+        self.day = 0
+        self.day_open = False
+        self.last_closing_stock = None
+
+        # Sales can be recorded by several threads in concurrent mode
+        self.lock = threading.Lock()
+
+        # Counter lists are copied before they are changed while they are shared with a copy
+        self.__counters_shared = False
+
+
+
+    def copy(self) -> "SalesAnalytics":
+        """
+        Returns a copy whose counters can change without changing this object. Item, vendor, and tag data that never changes is shared, and the counter lists are shared until either object changes them.
+        """
+
+        with self.lock:
+            output = copy.copy(self)
+            self.__counters_shared = True
+
+        output.__counters_shared = True
+        output.lock = threading.Lock()
+
+        return output
+
+
+
+    def __own_counters(self):
+        """
+        Gives this object its own copies of counter lists that are shared with a copy. The lock must be held, or the object not yet used by other threads.
+        """
+
+        if not self.__counters_shared:
+            return
+
+        for name in SalesAnalytics.COUNTER_NAMES:
+            setattr(self, name, list(getattr(self, name)))
+
+        self.__counters_shared = False
+
+
+
+    def start_day(self, day: int, open_minute: int, stock: list):
+        """
+        Resets the day counters. Should be called by a Store Simulator object when a day begins.
+
+        day: The day that is beginning.
+
+        open_minute: Minute that the store opens.
+
+        stock: Stock of each row when the store opens.
+        """
+
+        self.__own_counters()
+
+        self.day = day
+        self.day_open = True
+
+        self.day_units = [0] * self.item_count
+        self.day_revenue = [0.0] * self.item_count
+        self.day_vendor_units = [0] * len(self.vendor_names)
+        self.day_vendor_revenue = [0.0] * len(self.vendor_names)
+        self.day_tag_units = [0] * len(self.tag_names)
+        self.day_tag_revenue = [0.0] * len(self.tag_names)
+        self.day_opening_stock = list(stock)
+        self.day_stock_received = [0] * self.item_count
+        self.day_first_stock_out = [None] * self.item_count
+        self.day_stock_out_minutes = [0] * self.item_count
+
+        for row_index in range(self.item_count):
+            # Anything added since the last day closed counts as received stock
+            if self.last_closing_stock is None:
+                self.total_stock_received[row_index] += max(stock[row_index], 0)
+            elif stock[row_index] > self.last_closing_stock[row_index]:
+                self.total_stock_received[row_index] += stock[row_index] - self.last_closing_stock[row_index]
+
+            # Items that open with no stock are out of stock from the start of the day
+            if stock[row_index] <= 0:
+                self.out_of_stock_since[row_index] = open_minute
+                self.day_first_stock_out[row_index] = open_minute
+            else:
+                self.out_of_stock_since[row_index] = None
+
+
+
+    def end_day(self, close_minute: int, stock: list):
+        """
+        Adds the stock out minutes of items that are still out of stock. Should be called by a Store Simulator object when a day ends.
+
+        close_minute: Minute that the store closes.
+
+        stock: Stock of each row when the store closes.
+        """
+
+        if not self.day_open:
+            return
+
+        self.__own_counters()
+
+        for row_index in range(self.item_count):
+            if self.out_of_stock_since[row_index] is not None:
+                self.__add_stock_out_minutes(row_index, close_minute - self.out_of_stock_since[row_index])
+                self.out_of_stock_since[row_index] = None
+
+            if self.day_first_stock_out[row_index] is not None:
+                self.stock_out_days[row_index] += 1
+
+        self.last_closing_stock = list(stock)
+        self.day_open = False
+
+
+
+    def record_sale(self, row_index: int, price: float, minute: int, remaining_stock: int):
+        """
+        Adds one sold unit of the item in the row index to the counters.
+
+        row_index: Row of the item in the store's item list.
+
+        price: Price that was paid for the item.
+
+        minute: Minute of the day that the item was sold.
+
+        remaining_stock: Stock of the item after the sale.
+        """
+
+        vendor_index = self.item_vendor_index[row_index]
+
+        with self.lock:
+            self.__own_counters()
+
+            self.day_units[row_index] += 1
+            self.day_revenue[row_index] += price
+            self.total_units[row_index] += 1
+            self.total_revenue[row_index] += price
+
+            self.day_vendor_units[vendor_index] += 1
+            self.day_vendor_revenue[vendor_index] += price
+            self.total_vendor_units[vendor_index] += 1
+            self.total_vendor_revenue[vendor_index] += price
+
+            for tag_index in self.item_tag_indices[row_index]:
+                self.day_tag_units[tag_index] += 1
+                self.day_tag_revenue[tag_index] += price
+                self.total_tag_units[tag_index] += 1
+                self.total_tag_revenue[tag_index] += price
+
+            # Check if the sale sold out the item
+            if remaining_stock <= 0 and self.out_of_stock_since[row_index] is None:
+                self.out_of_stock_since[row_index] = minute
+
+                if self.day_first_stock_out[row_index] is None:
+                    self.day_first_stock_out[row_index] = minute
+
+
+
+    def record_sales(self, row_units: dict, row_revenue: dict, sold_out_minutes: dict):
+        """
+        Adds sold units of several items to the counters at once, such as purchases that were decided outside of a store's day loop.
+
+        row_units: Dict of row index to units sold.
+
+        row_revenue: Dict of row index to the total paid for the units.
+
+        sold_out_minutes: Dict of row index to the minute the item sold out, for items that the sales left with no stock.
+        """
+
+        with self.lock:
+            self.__own_counters()
+
+            for row_index, units in row_units.items():
+                revenue = row_revenue[row_index]
+                vendor_index = self.item_vendor_index[row_index]
+
+                self.day_units[row_index] += units
+                self.day_revenue[row_index] += revenue
+                self.total_units[row_index] += units
+                self.total_revenue[row_index] += revenue
+
+                self.day_vendor_units[vendor_index] += units
+                self.day_vendor_revenue[vendor_index] += revenue
+                self.total_vendor_units[vendor_index] += units
+                self.total_vendor_revenue[vendor_index] += revenue
+
+                for tag_index in self.item_tag_indices[row_index]:
+                    self.day_tag_units[tag_index] += units
+                    self.day_tag_revenue[tag_index] += revenue
+                    self.total_tag_units[tag_index] += units
+                    self.total_tag_revenue[tag_index] += revenue
+
+            for row_index, minute in sold_out_minutes.items():
+                if self.out_of_stock_since[row_index] is None:
+                    self.out_of_stock_since[row_index] = minute
+
+                    if self.day_first_stock_out[row_index] is None:
+                        self.day_first_stock_out[row_index] = minute
+
+
+
+    def record_stock_change(self, row_index: int, minute: int, quantity: int, new_stock: int):
+        """
+        Updates received stock and stock out tracking after stock of an item is changed while the store is open.
+
+        row_index: Row of the item in the store's item list.
+
+        minute: Minute of the day that the stock changed.
+
+        quantity: Number that was added to the item's stock, stock that is added counts as received.
+
+        new_stock: Stock of the item after the change.
+        """
+
+        if not self.day_open:
+            return
+
+        with self.lock:
+            self.__own_counters()
+
+            # Stock added while the store is open is part of the closing stock, so the next day does not count it again
+            if quantity > 0:
+                self.day_stock_received[row_index] += quantity
+                self.total_stock_received[row_index] += quantity
+
+            if new_stock > 0 and self.out_of_stock_since[row_index] is not None:
+                # Item is back in stock
+                self.__add_stock_out_minutes(row_index, minute - self.out_of_stock_since[row_index])
+                self.out_of_stock_since[row_index] = None
+            elif new_stock <= 0 and self.out_of_stock_since[row_index] is None:
+                self.out_of_stock_since[row_index] = minute
+
+                if self.day_first_stock_out[row_index] is None:
+                    self.day_first_stock_out[row_index] = minute
+
+
+
+    def get_item_sales(self, item_id: int, all_days: bool = False) -> dict:
+        """
+        Returns a dict of the units sold, revenue, and minutes out of stock of the inputted item id.
+
+        The dict also has the first minute the item was out of stock (None if it was not) when all_days is False.
+        """
+
+        row_index = self.item_rows[item_id]
+
+        if all_days:
+            return {"Item Id": item_id, "Units": self.total_units[row_index], "Revenue": round(self.total_revenue[row_index], 2),
+                    "Stock Out Minutes": self.get_stock_out_minutes(item_id, True), "Stock Out Days": self.stock_out_days[row_index]}
+
+        return {"Item Id": item_id, "Units": self.day_units[row_index], "Revenue": round(self.day_revenue[row_index], 2),
+                "Stock Out Minutes": self.get_stock_out_minutes(item_id), "First Stock Out": self.day_first_stock_out[row_index]}
+
+
+
+    def get_best_sellers(self, count: int = 10, all_days: bool = False, by_revenue: bool = False) -> list:
+        """
+        Returns a list of [item id, units, revenue] for the best selling items, best first.
+
+        count: Max number of items to return.
+
+        all_days: Uses the counters across all days instead of the current day.
+
+        by_revenue: Ranks items by revenue instead of units sold.
+        """
+
+        units = self.total_units if all_days else self.day_units
+        revenue = self.total_revenue if all_days else self.day_revenue
+
+        ranking = revenue if by_revenue else units
+
+        # Only rank items that sold something
+        rows = [row_index for row_index in range(self.item_count) if units[row_index] > 0]
+        rows.sort(key=lambda row_index: ranking[row_index], reverse=True)
+
+        return [[self.item_ids[row_index], units[row_index], round(revenue[row_index], 2)] for row_index in rows[:count]]
+
+
+
+    def get_vendor_sales(self, all_days: bool = False) -> dict:
+        """
+        Returns a dict of vendor name to [units, revenue].
+        """
+
+        units = self.total_vendor_units if all_days else self.day_vendor_units
+        revenue = self.total_vendor_revenue if all_days else self.day_vendor_revenue
+
+        return {self.vendor_names[index]: [units[index], round(revenue[index], 2)] for index in range(len(self.vendor_names))}
+
+
+
+    def get_tag_sales(self, all_days: bool = False) -> dict:
+        """
+        Returns a dict of tag to [units, revenue]. An item with several tags counts towards each of them.
+        """
+
+        units = self.total_tag_units if all_days else self.day_tag_units
+        revenue = self.total_tag_revenue if all_days else self.day_tag_revenue
+
+        return {self.tag_names[index]: [units[index], round(revenue[index], 2)] for index in range(len(self.tag_names))}
+
+
+
+    def get_sell_through(self, item_id: int, all_days: bool = False) -> float:
+        """
+        Returns the fraction of available stock of the inputted item id that was sold.
+
+        For the current day, available stock is the opening stock and the stock added during the day. Across all days, it is the stock received over every day.
+        """
+
+        row_index = self.item_rows[item_id]
+
+        if all_days:
+            available = self.total_stock_received[row_index]
+            sold = self.total_units[row_index]
+        else:
+            available = self.day_opening_stock[row_index] + self.day_stock_received[row_index]
+            sold = self.day_units[row_index]
+
+        if available <= 0:
+            return 0.0
+
+        return sold / available
+
+
+
+    def get_stock_out_minutes(self, item_id: int, all_days: bool = False) -> int:
+        """
+        Returns the minutes that the inputted item id was out of stock while the store was open.
+
+        If the day has not ended, an item that is still out of stock only counts up to its last recorded change.
+        """
+
+        row_index = self.item_rows[item_id]
+
+        if all_days:
+            return self.total_stock_out_minutes[row_index]
+
+        return self.day_stock_out_minutes[row_index]
+
+
+
+    def __add_stock_out_minutes(self, row_index: int, minutes: int):
+        """
+        Adds minutes to the day and total stock out minutes of the row index.
+        """
+
+        self.day_stock_out_minutes[row_index] += minutes
+        self.total_stock_out_minutes[row_index] += minutes
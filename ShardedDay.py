@@ -0,0 +1,691 @@
+import os
+import time
+import bisect
+import atexit
+import collections
+import multiprocessing
+
+import random as rand
+import StoreSimulator as sim
+
+from array import array
+
+class DayShard:
+    # Index of each value in a customer's list of state
+    TAG_MASK = 0
+    MONEY = 1
+    BUY_ATTEMPTS = 2
+    USING_CREDIT = 3
+    STARTING_MONEY = 4
+
+
+    def __init__(self, item_tag_masks: list, item_weights: array, day_prices: list, look_chance: float, buy_chance: float, start_minute: float, action_interval_minutes: float, seed: int):
+        """
+        Initializes a Day Shard object, which runs the customers of one shard of a Sharded Day in a worker process.
+
+        The shard only knows its own customers and a view of the stock that the Sharded Day sends at the start of each window, so buys are optimistic until the Sharded Day reconciles them.
+
+        item_tag_masks: Tag mask of each row of the item list.
+
+        item_weights: Weight of each row of the item list.
+
+        day_prices: Price array of each action interval of the day, see StoreSimulator.get_day_prices.
+
+        seed: Seed of the shard's random number generator.
+        """
+
+        self.item_tag_masks = item_tag_masks
+        self.item_weights = item_weights
+        self.day_prices = day_prices
+
+        self.look_chance = look_chance
+        self.buy_chance = buy_chance
+        self.start_minute = start_minute
+        self.action_interval_minutes = action_interval_minutes
+
+        self.rng = rand.Random(seed)
+
+        # Customer id to list of customer state, in the order the customers entered
+        self.customers = {}
+
+        self.stock = None
+
+
+
+    def run_window(self, stock: array, first_minute: float, interval_count: int, entries: list, refunds: list) -> tuple:
+        """
+        Runs the action intervals of a window and returns a tuple of arrays of the buys, arrays of the leaves, the number of customer actions, and the CPU seconds the window took.
+
+        Buys are (interval, customer id, row index, price) and leaves are (interval, customer id, buy attempts, money spent), where interval is counted from the start of the window.
+
+        stock: Stock of each row at the start of the window.
+
+        first_minute: Minute of the first action interval of the window.
+
+        interval_count: Number of action intervals in the window.
+
+        entries: List of (interval, customer id, tag mask, money, buy attempts, using credit) for the customers that enter the shard during the window, in the order they enter.
+
+        refunds: List of (customer id, price) for buys of the last window that were taken back.
+        """
+
+        start = time.process_time()
+
+        # Customers that already left keep nothing
+        for customer_id, price in refunds:
+            if customer_id in self.customers:
+                self.customers[customer_id][DayShard.MONEY] += price
+
+        self.stock = stock
+
+        buy_intervals = array("q")
+        buy_customers = array("q")
+        buy_rows = array("q")
+        buy_prices = array("d")
+
+        leave_intervals = array("q")
+        leave_customers = array("q")
+        leave_attempts = array("d")
+        leave_spent = array("d")
+
+        actions = 0
+        entry_index = 0
+
+        # Potential buys of each tag mask, cleared when an item sells out in the view
+        potential_buys_cache = {}
+
+        for interval in range(interval_count):
+            minute = first_minute + interval * self.action_interval_minutes
+            price_index = int((minute - self.start_minute) // self.action_interval_minutes)
+            prices = self.day_prices[max(0, min(price_index, len(self.day_prices) - 1))]
+
+            leaving = []
+
+            # Customers in the shard take an action, like StoreSimulator.__customer_action
+            for customer_id, customer in self.customers.items():
+                actions += 1
+
+                if customer[DayShard.BUY_ATTEMPTS] <= 0:
+                    leaving.append(customer_id)
+                    continue
+
+                choice = self.rng.random()
+
+                if choice < self.look_chance:
+                    customer[DayShard.BUY_ATTEMPTS] -= 0.2
+                elif choice < self.buy_chance + self.look_chance:
+                    if customer[DayShard.TAG_MASK] not in potential_buys_cache:
+                        potential_buys_cache[customer[DayShard.TAG_MASK]] = self.__get_potential_buys(customer[DayShard.TAG_MASK])
+                    potential_buys = potential_buys_cache[customer[DayShard.TAG_MASK]]
+
+                    if len(potential_buys) == 0:
+                        leaving.append(customer_id)
+                        continue
+
+                    row_index = potential_buys[self.rng.randint(0, len(potential_buys) - 1)]
+                    customer[DayShard.BUY_ATTEMPTS] -= 1
+
+                    if stock[row_index] <= 0:
+                        continue
+
+                    price = prices[row_index]
+
+                    if price <= customer[DayShard.MONEY] or customer[DayShard.USING_CREDIT]:
+                        customer[DayShard.MONEY] = customer[DayShard.MONEY] - price
+                        stock[row_index] = stock[row_index] - 1
+
+                        buy_intervals.append(interval)
+                        buy_customers.append(customer_id)
+                        buy_rows.append(row_index)
+                        buy_prices.append(price)
+
+                        if stock[row_index] <= 0:
+                            potential_buys_cache.clear()
+                else:
+                    leaving.append(customer_id)
+
+            for customer_id in leaving:
+                customer = self.customers.pop(customer_id)
+
+                leave_intervals.append(interval)
+                leave_customers.append(customer_id)
+                leave_attempts.append(customer[DayShard.BUY_ATTEMPTS])
+                leave_spent.append(customer[DayShard.STARTING_MONEY] - customer[DayShard.MONEY])
+
+            # Customers enter after the actions of the interval
+            while(entry_index < len(entries) and entries[entry_index][0] == interval):
+                _, customer_id, tag_mask, money, buy_attempts, using_credit = entries[entry_index]
+                self.customers[customer_id] = [tag_mask, money, buy_attempts, using_credit, money]
+                entry_index += 1
+
+        return (buy_intervals, buy_customers, buy_rows, buy_prices, leave_intervals, leave_customers, leave_attempts, leave_spent, actions, time.process_time() - start)
+
+
+
+    def get_remaining_customers(self) -> list:
+        """
+        Returns a list of (customer id, buy attempts, money spent) of the customers still in the shard, and removes them.
+        """
+
+        output = [(customer_id, customer[DayShard.BUY_ATTEMPTS], customer[DayShard.STARTING_MONEY] - customer[DayShard.MONEY]) for customer_id, customer in self.customers.items()]
+        self.customers = {}
+
+        return output
+
+
+
+    def __get_potential_buys(self, tag_mask: int) -> list:
+        """
+        Returns a list of row indices that a customer with the tag mask could buy in the stock view, like StoreSimulator.__get_customer_potential_buys.
+        """
+
+        output = []
+        stock = self.stock
+
+        for row_index, item_mask in enumerate(self.item_tag_masks):
+            if item_mask & tag_mask and stock[row_index] > 0:
+                for _ in range(0, self.item_weights[row_index]):
+                    output.append(row_index)
+
+        return output
+
+
+
+def run_shard_worker(connection):
+    """
+    Runs Day Shard objects in a worker process for the messages sent by a Sharded Day, until it is sent None.
+    """
+
+    shard = None
+
+    while(True):
+        message = connection.recv()
+
+        if message is None:
+            break
+
+        kind, payload = message
+
+        # Errors are sent back so the Sharded Day can raise them
+        try:
+            if kind == "day":
+                shard = DayShard(*payload)
+                continue
+            elif kind == "window":
+                output = shard.run_window(*payload)
+            else:
+                output = shard.get_remaining_customers()
+        except Exception as error:
+            output = error
+
+        connection.send(output)
+
+    connection.close()
+
+
+
+class ShardedDay:
+
+
+
+    def __init__(self, store: sim.StoreSimulator, shard_count: int = None, seed: int = None, window_intervals: int = 12):
+        """
+        Initializes a Sharded Day object, which simulates a single day of a store across worker processes.
+
+        Customers are split between shards as they enter, and each shard runs its customers' actions for a window of action intervals at a time against its own view of the stock. At the end of each window,
+        items that the shards sold more of than were in stock are given to the earliest buys by (action interval, shard, order in the shard) and the other buys are taken back and refunded.
+        The kept buys are then applied to the stock, purchase log, and sales analytics at once, and transactions are made from each leaving customer's summary from their shard, so the store is updated like a normal day without repeating each buy.
+
+        A seed gives the same day for the same shard count and window size, however the worker processes are scheduled.
+
+        store: Store Simulator object to simulate.
+
+        shard_count: Number of worker processes. Uses the CPU count if None.
+
+        seed: Seed of the customer arrivals and of each shard's random numbers. A random seed is used if None.
+
+        window_intervals: Number of action intervals that shards run between reconciles. Longer windows wait less on the workers but take back more buys of items that sell out.
+        """
+
+        self.store = store
+        self.shard_count = max(1, shard_count if shard_count is not None else (os.cpu_count() or 1))
+        self.window_intervals = max(1, window_intervals)
+
+        if seed is None:
+            seed = rand.getrandbits(64)
+
+        self.seed = seed
+        self.rng = rand.Random(seed)
+
+        # Buys taken back during the last simulated day
+        self.revoked_buys = 0
+
+        # CPU seconds of the last simulated day spent in this process, and spent by each shard running windows
+        self.parent_seconds = 0.0
+        self.shard_seconds = []
+
+        # Number of customers left to draw from the customer list during a day
+        self.__remaining = 0
+
+        self.__connections = []
+        self.__processes = []
+
+        # Worker processes are stopped before the program exits
+        atexit.register(self.close)
+
+
+
+    def simulate_one_day(self, customer_list: list = [], use_random_customers: bool = False, customer_enter_chance: float = 0.1, customer_enter_max: int = 3) -> int:
+        """
+        Simulates one day of operation for the store and returns the number of buys that were taken back. See StoreSimulator.simulate_one_day for the inputs.
+
+        Names of customers in customer_list should be unique.
+        """
+
+        store = self.store
+
+        self.__start_workers()
+
+        day_start = time.process_time()
+        self.shard_seconds = [0.0] * self.shard_count
+
+        store.start_new_day()
+
+        if not store.quiet:
+            print("Store: " + store.store_name + " Day " + str(store.day) + " begins.\n")
+
+        catalog = store.get_catalog_arrays()
+        stock = catalog["Stock"]
+
+        start_minute = store.start_hour * 60
+        end_minute = store.end_hour * 60
+        interval_minutes = store.action_interval_minutes
+
+        # Minutes of the action intervals of the day, customers first enter at the opening minute
+        action_minutes = []
+        minute = start_minute
+
+        while(minute < end_minute):
+            action_minutes.append(minute)
+            minute = minute + interval_minutes
+
+        close_minute = minute
+
+        # Every shard gets the item data and its own seed for the day
+        day_prices = store.get_day_prices()
+
+        for connection in self.__connections:
+            connection.send(("day", (catalog["Tag Mask"], catalog["Weight"], day_prices, store.look_chance, store.buy_chance, start_minute, interval_minutes, self.rng.getrandbits(64))))
+
+        # Customers are drawn from customer_list through a list of undrawn indices
+        customer_order = array("q", range(len(customer_list)))
+        self.__remaining = len(customer_list)
+
+        # Customer id to the customer that will enter the store, and to the customer object in the store
+        arriving = {}
+        entered = {}
+
+        next_customer_id = 0
+        refunds = [[] for _ in range(self.shard_count)]
+        unrefunded = {}
+        pending = None
+
+        self.revoked_buys = 0
+
+        for first_interval in range(0, len(action_minutes), self.window_intervals):
+            window = action_minutes[first_interval:first_interval + self.window_intervals]
+
+            # Arrivals of the window are decided before the shards run it, they do not depend on what customers do
+            entries = [[] for _ in range(self.shard_count)]
+            arrivals = []
+
+            for interval in range(len(window)):
+                for customer in self.__draw_arrivals(customer_list, customer_order, use_random_customers, customer_enter_chance, customer_enter_max):
+                    if customer.tag_codes is not store.tag_codes:
+                        customer.set_tag_mask(store.encode_tags(customer.item_tags), store.tag_codes)
+
+                    # Customers are dealt to the shards in the order they arrive
+                    entries[next_customer_id % self.shard_count].append((interval, next_customer_id, customer.tag_mask, customer.starting_money, customer.starting_buy_attempts, customer.using_credit))
+                    arrivals.append((interval, next_customer_id))
+                    arriving[next_customer_id] = customer
+                    next_customer_id += 1
+
+            for shard in range(self.shard_count):
+                self.__connections[shard].send(("window", (stock, window[0], len(window), entries[shard], refunds[shard])))
+
+            # The last window is applied to the store while the shards run this one
+            if pending is not None:
+                self.__apply_window(*pending, arriving, entered)
+
+            results = [self.__receive(connection) for connection in self.__connections]
+
+            for shard, result in enumerate(results):
+                self.shard_seconds[shard] += result[9]
+
+            revoked, refunds, unrefunded = self.__reconcile(results, stock)
+
+            pending = (window, arrivals, results, revoked, unrefunded)
+
+        if pending is not None:
+            self.__apply_window(*pending, arriving, entered)
+
+        # Customers still in the store are settled with their shard's summary, the refunds of the last window never reached the shards
+        for connection in self.__connections:
+            connection.send(("close", None))
+
+        for connection in self.__connections:
+            for customer_id, buy_attempts, money_spent in self.__receive(connection):
+                self.__settle_customer(entered[customer_id], buy_attempts, money_spent - unrefunded.get(customer_id, 0.0))
+
+        # Close the store at the same minute as simulate_one_day
+        store.set_current_minute(close_minute - interval_minutes)
+        store.do_action_interval()
+
+        if not store.quiet:
+            print("\nStore: " + store.store_name + " Day " + str(store.day) + " ends.")
+
+        self.parent_seconds = time.process_time() - day_start
+
+        return self.revoked_buys
+
+
+
+    def close(self):
+        """
+        Stops the worker processes. They are started again if another day needs them. Safe to call more than once.
+        """
+
+        for connection in self.__connections:
+            try:
+                connection.send(None)
+                connection.close()
+            except (OSError, ValueError):
+                pass
+
+        for process in self.__processes:
+            process.join()
+
+        self.__connections = []
+        self.__processes = []
+
+
+
+    def __start_workers(self):
+        """
+        Starts a worker process for each shard if they are not running.
+        """
+
+        if len(self.__processes) == self.shard_count:
+            return
+
+        self.close()
+
+        for shard in range(self.shard_count):
+            connection, worker_connection = multiprocessing.Pipe()
+
+            process = multiprocessing.Process(target=run_shard_worker, args=(worker_connection,), name="Store Shard " + str(shard), daemon=True)
+            process.start()
+            worker_connection.close()
+
+            self.__connections.append(connection)
+            self.__processes.append(process)
+
+
+
+    def __receive(self, connection):
+        """
+        Returns the next result of a worker, raising it if it is an error.
+        """
+
+        output = connection.recv()
+
+        if isinstance(output, Exception):
+            raise output
+
+        return output
+
+
+
+    def __draw_arrivals(self, customer_list: list, customer_order: array, use_random_customers: bool, customer_enter_chance: float, customer_enter_max: int) -> list:
+        """
+        Returns a list of the customers that arrive at the end of an action interval, drawn like StoreSimulator.simulate_one_day draws them.
+        """
+
+        output = []
+
+        if self.rng.random() >= customer_enter_chance:
+            return output
+
+        customers_enter_count = self.rng.randint(1, customer_enter_max)
+
+        if self.__remaining > customers_enter_count:
+            # Draw customers from the list without drawing any twice
+            while(customers_enter_count > 0):
+                position = self.rng.randint(0, self.__remaining - 1)
+                output.append(customer_list[customer_order[position]])
+
+                customer_order[position] = customer_order[self.__remaining - 1]
+                self.__remaining = self.__remaining - 1
+                customers_enter_count = customers_enter_count - 1
+        elif self.__remaining != 0:
+            # Add rest of customer list
+            while(self.__remaining > 0):
+                output.append(customer_list[customer_order[self.__remaining - 1]])
+                self.__remaining = self.__remaining - 1
+        elif use_random_customers:
+            # Random customers are made from this day's random numbers, so the seed decides them
+            old_rng = self.store.rng
+            self.store.rng = self.rng
+
+            try:
+                while(customers_enter_count > 0):
+                    output.append(self.store.generate_random_customer())
+                    customers_enter_count = customers_enter_count - 1
+            finally:
+                self.store.rng = old_rng
+
+        return output
+
+
+
+    def __reconcile(self, results: list, stock: array) -> tuple:
+        """
+        Takes back buys of items that the shards sold more of than were in stock and takes the kept buys out of the stock.
+
+        Returns a tuple of a set of (shard, buy index) of the buys taken back, a list per shard of (customer id, price) refunds, and a dict of customer id to the total refunded.
+        """
+
+        sold = collections.Counter()
+
+        for result in results:
+            sold.update(result[2])
+
+        revoked = set()
+        refunds = [[] for _ in range(self.shard_count)]
+        unrefunded = {}
+
+        oversold = {}
+
+        for row_index, count in sold.items():
+            if count <= stock[row_index]:
+                stock[row_index] = stock[row_index] - count
+            else:
+                oversold[row_index] = []
+
+        if len(oversold) == 0:
+            return revoked, refunds, unrefunded
+
+        # The earliest buys get the stock
+        for shard, result in enumerate(results):
+            buy_intervals, buy_rows = result[0], result[2]
+
+            for buy_index, row_index in enumerate(buy_rows):
+                if row_index in oversold:
+                    oversold[row_index].append((buy_intervals[buy_index], shard, buy_index))
+
+        for row_index, buys in oversold.items():
+            buys.sort()
+
+            for _, shard, buy_index in buys[max(0, stock[row_index]):]:
+                customer_id = results[shard][1][buy_index]
+                price = results[shard][3][buy_index]
+
+                revoked.add((shard, buy_index))
+                refunds[shard].append((customer_id, price))
+                unrefunded[customer_id] = unrefunded.get(customer_id, 0.0) + price
+
+            stock[row_index] = min(stock[row_index], 0)
+
+        self.revoked_buys += len(revoked)
+
+        return revoked, refunds, unrefunded
+
+
+
+    def __apply_window(self, window: list, arrivals: list, results: list, revoked: set, unrefunded: dict, arriving: dict, entered: dict):
+        """
+        Applies a reconciled window to the store. Customers enter, the kept buys are added at once in order of action interval, then shard, then order in the shard, and leaving customers are settled from their shard's summary.
+        """
+
+        store = self.store
+
+        # Customers enter first, so they are in the store for their buys
+        for interval, customer_id in arrivals:
+            store.set_current_minute(window[interval])
+            entered[customer_id] = store.customer_enters(arriving.pop(customer_id))
+
+        customers = []
+        rows = array("q")
+        prices = array("d")
+        minutes = array("d")
+
+        buy_starts = [0] * self.shard_count
+
+        for interval, minute in enumerate(window):
+            for shard, result in enumerate(results):
+                buy_intervals, buy_customers, buy_rows, buy_prices = result[0], result[1], result[2], result[3]
+
+                # Buys of a shard are in interval order, so each interval is a slice
+                start = buy_starts[shard]
+                end = bisect.bisect_right(buy_intervals, interval, start)
+                buy_starts[shard] = end
+
+                if start == end:
+                    continue
+
+                if len(revoked) == 0:
+                    customers.extend([entered[customer_id] for customer_id in buy_customers[start:end]])
+                    rows.extend(buy_rows[start:end])
+                    prices.extend(buy_prices[start:end])
+                    minutes.extend([minute] * (end - start))
+                else:
+                    for buy_index in range(start, end):
+                        if (shard, buy_index) not in revoked:
+                            customers.append(entered[buy_customers[buy_index]])
+                            rows.append(buy_rows[buy_index])
+                            prices.append(buy_prices[buy_index])
+                            minutes.append(minute)
+
+        store.apply_purchases(customers, rows, prices, minutes)
+
+        # Customers leave in order of action interval, then shard
+        leave_positions = [0] * self.shard_count
+
+        for interval, minute in enumerate(window):
+            store.set_current_minute(minute)
+
+            for shard, result in enumerate(results):
+                leave_intervals, leave_customers, leave_attempts, leave_spent = result[4], result[5], result[6], result[7]
+                leave_index = leave_positions[shard]
+
+                while(leave_index < len(leave_customers) and leave_intervals[leave_index] == interval):
+                    customer_id = leave_customers[leave_index]
+                    customer = entered.pop(customer_id)
+
+                    # Buys taken back in this window were not refunded by the shard before the customer left
+                    self.__settle_customer(customer, leave_attempts[leave_index], leave_spent[leave_index] - unrefunded.get(customer_id, 0.0))
+                    store.public_customer_leaves(customer)
+                    leave_index += 1
+
+                leave_positions[shard] = leave_index
+
+        if store.metrics_exporter is not None:
+            store.metrics_exporter.record_interval(store.store_name, len(window) * store.action_interval_minutes, sum(result[8] for result in results), len(rows), len(store.customers_in_store))
+
+
+
+    def __settle_customer(self, customer: "Customer", buy_attempts: float, money_spent: float):
+        """
+        Gives a customer in the store the buy attempts and money they ended with in their shard.
+        """
+
+        customer.max_buy_attempts = buy_attempts
+        customer.money = customer.money - money_spent
+
+
+
+def compare_shard_counts(shard_counts: list = [1, 2, 4], item_count: int = 2000, customer_count: int = 20000, customer_enter_chance: float = 1.0, customer_enter_max: int = 200, seed: int = 1) -> list:
+    """
+    Returns a list of dicts of the seconds taken to simulate the same day with StoreSimulator.simulate_one_day and with each shard count, along with the sales of each.
+
+    "Parent Seconds" is the CPU time of the work done in this process, which is not split between shards, and "Slowest Shard Seconds" is the CPU time the busiest shard spent running windows. With a core per shard, a day takes about the larger of the two, as windows are applied while the shards run the next one, while "Seconds" is the time it took on this machine.
+
+    Each shard count is run twice with the same seed to check that its day is the same. Uses a synthetic item list written by Benchmark.write_synthetic_item_list.
+    """
+
+    import tempfile
+    import Benchmark as bm
+
+    output = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        item_list_path = os.path.join(directory, "Items.csv")
+
+        rand.seed(seed)
+        bm.write_synthetic_item_list(item_list_path, item_count, 30)
+
+        for shard_count in [None] + shard_counts:
+            results = []
+
+            for _ in range(1 if shard_count is None else 2):
+                rand.seed(seed)
+
+                store = sim.StoreSimulator(item_list_path, 9, 17, 5, False, "Shard Compare")
+                store.quiet = True
+                customer_list = store.create_random_customer_list(customer_count)
+
+                start = time.perf_counter()
+                cpu_start = time.process_time()
+
+                if shard_count is None:
+                    store.simulate_one_day(customer_list, False, customer_enter_chance, customer_enter_max)
+                    revoked_buys = 0
+                    parent_seconds = time.process_time() - cpu_start
+                    slowest_shard_seconds = 0.0
+                else:
+                    sharded_day = ShardedDay(store, shard_count, seed)
+                    revoked_buys = sharded_day.simulate_one_day(customer_list, False, customer_enter_chance, customer_enter_max)
+                    parent_seconds = sharded_day.parent_seconds
+                    slowest_shard_seconds = max(sharded_day.shard_seconds)
+                    sharded_day.close()
+
+                results.append({"Shards": "Exact" if shard_count is None else shard_count, "Seconds": round(time.perf_counter() - start, 3),
+                                "Parent Seconds": round(parent_seconds, 3), "Slowest Shard Seconds": round(slowest_shard_seconds, 3),
+                                "Units Sold": sum(store.sales_analytics.day_units), "Revenue": round(sum(store.sales_analytics.day_revenue), 2),
+                                "Transactions": len(store.customer_transactions), "Revoked Buys": revoked_buys})
+
+            if len(results) == 2:
+                timings = ("Seconds", "Parent Seconds", "Slowest Shard Seconds")
+                results[0]["Repeatable"] = {name: value for name, value in results[0].items() if name not in timings} == {name: value for name, value in results[1].items() if name not in timings}
+
+            output.append(results[0])
+
+    return output
+
+
+
+if __name__ == "__main__":
+    print("CPU count: " + str(os.cpu_count()))
+
+    for result in compare_shard_counts():
+        print(result)
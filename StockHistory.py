@@ -0,0 +1,252 @@
+import csv
+import bisect
+
+from array import array
+
+class StockHistory:
+    # Columns of a stock history csv
+    COLUMNS = ["Day", "Event", "Type", "Item Id", "Value"]
+
+    # Used in the "Type" column. Full rows have the stock of an item, and delta rows have the change since the last entry
+    FULL_TYPE = "Full"
+    DELTA_TYPE = "Delta"
+
+
+    def __init__(self, item_ids: list, keyframe_interval: int = 7):
+        """
+        Initializes a Stock History object, which records the stock of a store after days and restocks.
+
+        Only items with changed stock are recorded for an entry, with a full copy of the stock (a keyframe) every keyframe_interval days, so the stock of any entry can be rebuilt from the keyframe before it.
+
+        item_ids: Item id of each row of a store's item list.
+
+        keyframe_interval: Number of days between keyframes.
+        """
+
+        self.item_ids = item_ids
+        self.keyframe_interval = max(1, keyframe_interval)
+
+        # Used to find the row of an item id
+        self.item_rows = {item_id: row_index for row_index, item_id in enumerate(item_ids)}
+
+        # One value per entry in the order they were recorded
+        self.entry_days = []
+        self.entry_events = []
+
+        # Entry index of the keyframe that an entry is rebuilt from
+        self.entry_keyframes = []
+
+        # A stock array for keyframes and (rows array, deltas array) for other entries
+        self.entry_data = []
+
+        # Used to find an entry from its day and event
+        self.entry_index = {}
+
+        # Stock of the last entry, used to find changes
+        self.last_stock = None
+        self.last_keyframe_day = None
+
+        # Rows that have not been taken by get_new_rows
+        self.new_rows = []
+
+
+
+    def record(self, day: int, event: str, stock: array):
+        """
+        Adds an entry for the stock of a store.
+
+        day: Day of the entry.
+
+        event: Name of the entry, such as "After Day" or "After Updating".
+
+        stock: Stock of each row of the item list.
+
+        Raises ValueError if the day is before the day of the last entry, as entries are found by day.
+        """
+
+        if len(self.entry_days) > 0 and day < self.entry_days[-1]:
+            raise ValueError("Stock history entry for day " + str(day) + " is before the last entry on day " + str(self.entry_days[-1]) + ".")
+
+        entry = len(self.entry_days)
+
+        if self.last_stock is None or day - self.last_keyframe_day >= self.keyframe_interval:
+            # Record a keyframe
+            data = array("q", stock)
+            self.entry_keyframes.append(entry)
+            self.last_keyframe_day = day
+
+            for row_index in range(len(data)):
+                self.new_rows.append([day, event, StockHistory.FULL_TYPE, self.item_ids[row_index], data[row_index]])
+        else:
+            # Record only the rows that changed
+            rows = array("q")
+            deltas = array("q")
+
+            for row_index in range(len(stock)):
+                if stock[row_index] != self.last_stock[row_index]:
+                    rows.append(row_index)
+                    deltas.append(stock[row_index] - self.last_stock[row_index])
+
+            data = (rows, deltas)
+            self.entry_keyframes.append(self.entry_keyframes[-1])
+
+            for row_index, delta in zip(rows, deltas):
+                self.new_rows.append([day, event, StockHistory.DELTA_TYPE, self.item_ids[row_index], delta])
+
+            # An entry with no changes still gets a row so it is kept in the file
+            if len(rows) == 0:
+                self.new_rows.append([day, event, StockHistory.DELTA_TYPE, "", 0])
+
+        self.entry_days.append(day)
+        self.entry_events.append(event)
+        self.entry_data.append(data)
+        self.entry_index[(day, event)] = entry
+
+        self.last_stock = array("q", stock)
+
+
+
+    def force_keyframe(self):
+        """
+        Makes the next recorded entry a keyframe, such as when the history file was deleted.
+        """
+
+        self.last_keyframe_day = None
+        self.last_stock = None
+
+
+
+    def get_new_rows(self) -> list:
+        """
+        Returns the csv rows of the entries recorded since the last call, so they can be appended to a history file.
+        """
+
+        output = self.new_rows
+        self.new_rows = []
+
+        return output
+
+
+
+    def get_stock(self, day: int, event: str = None) -> array:
+        """
+        Returns the stock of each row of the item list for an entry.
+
+        day: Day of the entry.
+
+        event: Name of the entry. If None, the last entry on or before the day is used.
+        """
+
+        if event is not None:
+            if (day, event) not in self.entry_index:
+                raise ValueError("There is no stock history entry for '" + event + "' on day " + str(day) + ".")
+
+            entry = self.entry_index[(day, event)]
+        else:
+            # Entries are recorded in day order
+            entry = bisect.bisect_right(self.entry_days, day) - 1
+
+            if entry < 0:
+                raise ValueError("There is no stock history entry on or before day " + str(day) + ".")
+
+        keyframe = self.entry_keyframes[entry]
+        output = array("q", self.entry_data[keyframe])
+
+        # Apply the changes of each entry after the keyframe
+        for data in self.entry_data[keyframe + 1:entry + 1]:
+            for row_index, delta in zip(data[0], data[1]):
+                output[row_index] += delta
+
+        return output
+
+
+
+    def get_stock_dict(self, day: int, event: str = None) -> dict:
+        """
+        Returns a dict of item id to stock for an entry. See get_stock.
+        """
+
+        return dict(zip(self.item_ids, self.get_stock(day, event)))
+
+
+
+    @staticmethod
+    def load(file_path: str, keyframe_interval: int = 7, item_ids: list = None) -> "StockHistory":
+        """
+        Returns a Stock History object with the entries of a stock history csv. Raises ValueError if the days in the file go backwards.
+
+        item_ids: Item id of each row of the store's item list. Ids in the file are matched to them by their text, and ids that do not match any are kept as text. If None, ids are read as ints if every id is an int, as floats if every id is a number, and as text otherwise, like StoreSimulator.set_item_list.
+        """
+
+        with open(file_path, newline="") as history_file:
+            reader = csv.reader(history_file)
+            next(reader)
+            rows = list(reader)
+
+        # Item ids are the ids of the first keyframe
+        id_texts = []
+
+        for row in rows:
+            if row[2] != StockHistory.FULL_TYPE:
+                break
+
+            if len(id_texts) > 0 and (int(row[0]), row[1]) != (int(rows[0][0]), rows[0][1]):
+                break
+
+            id_texts.append(row[3])
+
+        if item_ids is not None:
+            store_ids = {str(item_id): item_id for item_id in item_ids}
+            file_ids = [store_ids.get(id_text, id_text) for id_text in id_texts]
+        else:
+            file_ids = id_texts
+
+            for convert in (int, float):
+                try:
+                    file_ids = [convert(id_text) for id_text in id_texts]
+                    break
+                except ValueError:
+                    pass
+
+        history = StockHistory(file_ids, keyframe_interval)
+
+        # Rows of the ids as they are written in the file
+        text_rows = {id_text: row_index for row_index, id_text in enumerate(id_texts)}
+
+        stock = None
+        row_index = 0
+
+        # Rebuild the stock of each entry and record it again
+        while(row_index < len(rows)):
+            day = int(rows[row_index][0])
+            event = rows[row_index][1]
+
+            if rows[row_index][2] == StockHistory.FULL_TYPE:
+                stock = array("q", [0] * len(file_ids))
+            else:
+                stock = array("q", stock)
+
+            while(row_index < len(rows) and int(rows[row_index][0]) == day and rows[row_index][1] == event):
+                if rows[row_index][3] == "":
+                    # Entry with no changes
+                    row_index += 1
+                    continue
+
+                item_row = text_rows[rows[row_index][3]]
+
+                if rows[row_index][2] == StockHistory.FULL_TYPE:
+                    stock[item_row] = int(rows[row_index][4])
+                else:
+                    stock[item_row] += int(rows[row_index][4])
+
+                row_index += 1
+
+            # Keyframes are placed where the file had them
+            if rows[row_index - 1][2] == StockHistory.FULL_TYPE:
+                history.force_keyframe()
+
+            history.record(day, event, stock)
+
+        history.new_rows = []
+
+        return history
@@ -1,14 +1,24 @@
 import os
+import csv
+import copy
 import glob
+import itertools
+import threading
 
-import pandas as pd
 import random as rand
 import Customer as cr
+import SalesAnalytics as sa
+import StockHistory as sh
+import DayRecording as dr
+import PurchaseLog as pl
+import TransactionHistory as th
 
 from ast import literal_eval
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 
 class StoreSimulator:
-    # Used when determining what action a customer will take
+    # Default chances used when determining what action a customer will take
     LOOK_CHANCE = 0.6
     BUY_CHANCE = 0.38
     LEAVE_CHANCE = 0.02
@@ -16,8 +26,20 @@ class StoreSimulator:
     # Used to create a directory for all output files
     OUTPUT_DIR_NAME = "Store Simulator Output Files"
 
+    # Number of locks that item stock is striped across
+    STOCK_LOCK_STRIPES = 64
 
-    def __init__(self, file_name: str, start_hour: float, end_hour: float, action_interval_minutes: int, verbose: bool = False, store_name: str = "Default Name"):
+    # Columns that an item list must have
+    REQUIRED_COLUMNS = ["Item Id", "Name", "Vendor", "Cost (USD)", "Stock", "Tags", "Weight"]
+
+    # Columns of a transactions csv
+    TRANSACTION_COLUMNS = ["Transaction Id", "Customer Name", "Items", "Money Spent", "Time Entered", "Time Left"]
+
+    # Every day of every store gets its own epoch, so a customer is reset once when they enter a store on a new day
+    __day_epochs = itertools.count(1)
+
+
+    def __init__(self, file_name: str, start_hour: float, end_hour: float, action_interval_minutes: int, verbose: bool = False, store_name: str = "Default Name", worker_threads: int = 1):
         """
         Initializes a Store Simulator object.
 
@@ -32,13 +54,36 @@ class StoreSimulator:
         verbose: Prints more data to the console such as customers entering, buying, and leaving.
 
         store_name: The name given to the store for output files.
+
+        worker_threads: Number of threads that customer actions are run on during an action interval. Values above 1 enable concurrent mode, where the order of random draws between customers is not deterministic.
         """
 
+        # Locks guarding item stock, item rows share a lock when their index is equal modulo STOCK_LOCK_STRIPES
+        self.__stock_locks = [threading.Lock() for _ in range(StoreSimulator.STOCK_LOCK_STRIPES)]
+
+        # The stock array is copied before it is changed while it is shared with a fork
+        self.__stock_shared = False
+        self.__stock_copy_lock = threading.Lock()
+
         # Set up fields related to the item list
         
-        self.item_dataframe = None
+        self.item_columns = None
         self.item_groups = None
         self.item_group_names = None
+        self.tag_codes = None
+        self.sales_analytics = None
+
+        # Items bought during the day, customers find their items through it
+        self.purchase_log = None
+
+        # Stock History object used by output_stock when it is not None
+        self.stock_history = None
+
+        # Transaction History object that each day is saved to when the store closes, if not None
+        self.transaction_history = None
+
+        # Price Schedule object that the prices of each day are compiled from, prices are the item list costs if None
+        self.price_schedule = None
 
         self.set_item_list(file_name)
         
@@ -65,6 +110,7 @@ class StoreSimulator:
 
         self.current_minute = self.start_hour * 60
         self.day = 0
+        self.day_epoch = next(StoreSimulator.__day_epochs)
 
         # Action interval is in minutes
         self.action_interval_minutes = action_interval_minutes
@@ -76,41 +122,93 @@ class StoreSimulator:
         # Customers dict for which customers are in the store
         self.customers_in_store = {}
 
-        # Internal dict to group what items belong to what groups
-        self.item_groups = {}
-        self.item_group_names = []
-
-        self.__init_item_groups()
-
         self.next_transaction_id = 0
 
         # Debugging tool to print when customers do stuff
         self.verbose = verbose
 
+        # Stops the begin and end of day messages from being printed
+        self.quiet = False
+
+        # Chances used when determining what action a customer will take
+        self.look_chance = StoreSimulator.LOOK_CHANCE
+        self.buy_chance = StoreSimulator.BUY_CHANCE
+        self.leave_chance = StoreSimulator.LEAVE_CHANCE
+
         # Used to generate random customers
         self.__random_cust_id = 0
 
+        # Random number generator of the day loop, the random module unless the store is given its own
+        self.rng = rand
+
+        # Day Recording object that decisions are added to while record_one_day runs
+        self.__recording = None
+
+        # State of the day started by begin_day, see begin_day
+        self.__day_customer_list = []
+        self.__day_remaining = 0
+        self.__day_swapped = {}
+        self.__day_use_random_customers = False
+        self.__day_enter_chance = 0.1
+        self.__day_enter_max = 3
+        self.__day_running = False
+
+        # Forks copy customers as they enter, so customers shared with other branches are never changed
+        self.__copy_entering_customers = False
+        self.__fork_count = 0
+
         self.store_name = store_name
 
+        # Thread pool for concurrent mode
+        self.worker_threads = max(1, worker_threads)
+        self.__executor = None
+
+        # Output Writer object that output files are handed to, files are written right away if None
+        self.output_writer = None
+
+        # Metrics Exporter object that the day loop adds its counters to, if not None
+        self.metrics_exporter = None
 
 
-    def customer_enters(self, customer: cr.Customer):
+
+
+    def customer_enters(self, customer: cr.Customer) -> cr.Customer:
         """
-        Puts the input customer into the store's dictionary of customers.
+        Puts the input customer into the store's dictionary of customers and returns the customer object that is in the store.
+
+        The customer is reset first if this is the first time they are in a store on this day. A fork puts a copy of the customer in the store instead.
         """
 
+        if self.__copy_entering_customers:
+            customer = customer.copy()
+
+        customer.start_day(self.day_epoch)
+
         # Check if customer with same name is in the store
         # If the customer already exists, create a new object with a "?" added
         if customer.name in self.customers_in_store:
             print("Warning: customer '" + customer.name + "' is already in the store. Adding '?' to name.")
             customer = cr.Customer(customer.name + " ?", customer.item_tags, customer.money, customer.max_buy_attempts)
         
+        # Encode the customer's tags if they were not encoded with this store's tag codes
+        if customer.tag_codes is not self.tag_codes:
+            customer.set_tag_mask(self.encode_tags(customer.item_tags), self.tag_codes)
+
+        # Purchases from now on go to the store's log, customers that were already in the store today keep their handle
+        if customer.purchase_log is not self.purchase_log or customer.purchase_generation != self.purchase_log.generation:
+            customer.set_purchase_log(self.purchase_log)
+
         customer.set_enter(self.current_minute)
         self.customers_in_store[customer.name] = customer
 
+        if self.__recording is not None:
+            self.__recording.add_event(self.current_minute, customer, dr.DayRecording.ENTER)
+
         if(self.verbose):
             print(self.minutes_to_time(self.current_minute) + " Enter: " + customer.name + "            Store: " + self.store_name)
 
+        return customer
+
 
 
     def public_customer_leaves(self, customer: cr.Customer):
@@ -132,7 +230,7 @@ class StoreSimulator:
         """
 
         # Create an entry in customer transactions
-        self.customer_transactions.append([str(self.next_transaction_id), customer.name, self.__translate_items_bought(customer.items_bought), "{:.2f}".format(customer.get_money_difference()), 
+        self.customer_transactions.append([str(self.next_transaction_id), customer.name, self.__translate_items_bought(customer, False, self.price_schedule is not None), "{:.2f}".format(customer.get_money_difference()), 
                                            self.minutes_to_time(customer.enter), self.minutes_to_time(self.current_minute)])
         
         # Remove that customer from the dict
@@ -153,68 +251,251 @@ class StoreSimulator:
         """
 
         if self.check_if_name_in_store(customer.name):
-            self.__customer_action(customer)
+            if self.__customer_action(customer):
+                self.__customer_leaves(customer)
         else:
             raise ValueError("Customer '" + customer.name + "' is not in the store '" + self.store_name + "'.")
 
 
 
-    def __customer_action(self, customer: cr.Customer):
+    def __customer_action(self, customer: cr.Customer, purchases: tuple = None) -> bool:
         """
-        Makes the input customer buy something, do nothing, or leave the store.
+        Makes the input customer buy something, do nothing, or decide to leave the store.
+
+        Returns True if the customer leaves. The caller is responsible for calling __customer_leaves, so that only one thread changes customers_in_store and customer_transactions.
+
+        purchases: Purchase buffer of the customer's chunk in concurrent mode, see __customer_buys.
         """
         
         # Check if customer wants to buy something
         if customer.wants_more_items():
             # Use rand to determine an action that the customer will take
-            choice = rand.random()
+            choice = self.rng.random()
 
-            if choice < StoreSimulator.LOOK_CHANCE:
+            if choice < self.look_chance:
                 # Customer does nothing
 
                 # Buy amount slightly decreases to keep customers from staying too long
                 customer.decrease_buy_attempts(0.2)
-            elif choice < StoreSimulator.BUY_CHANCE + StoreSimulator.LOOK_CHANCE:
+            elif choice < self.buy_chance + self.look_chance:
                 # Customer tries to buy something
                 
                 potential_buys = self.__get_customer_potential_buys(customer)
         
                 # If list is empty, there is nothing left to buy or nothing the customer wants, so they leave
                 if potential_buys == []:
-                    self.__customer_leaves(customer)
                     if self.verbose:
                         print(customer.name + " list empty.")
-                    return
+                    if self.__recording is not None:
+                        self.__recording.add_event(self.current_minute, customer, dr.DayRecording.EMPTY_BUY)
+                    return True
                 
                 # Use rand to determine an item that the customer will buy
-                choice = rand.randint(0, len(potential_buys) - 1)
+                row_index = potential_buys[self.rng.randint(0, len(potential_buys) - 1)]
+                buy_attempts = customer.max_buy_attempts
 
-                # See if customer buys the item
-                # Will be true if the item is bought
-                if customer.buy_item(potential_buys[choice][0], potential_buys[choice][1]):
-                    # Get index of row using the item id
-                    row_index = self.get_row_index("Item Id", potential_buys[choice][0])
+                bought = self.__customer_buys(customer, row_index, purchases)
 
-                    # Change the stock
-                    self.item_dataframe.at[row_index, "Stock"] = self.item_dataframe.at[row_index, "Stock"] - 1
+                # The chosen row is recorded, so a replay only chooses again if the item can not be bought
+                if self.__recording is not None:
+                    self.__recording.add_event(self.current_minute, customer, dr.DayRecording.BUY if bought else dr.DayRecording.REFUSED_BUY, row_index, buy_attempts)
 
                 if(self.verbose):
-                    print(self.minutes_to_time(self.current_minute) + " Buy: " + customer.name + " tried to buy Id:" + str(potential_buys[choice][0]) + "           Store: " + self.store_name)
+                    print(self.minutes_to_time(self.current_minute) + " Buy: " + customer.name + " tried to buy Id:" + str(self.__item_ids[row_index]) + "           Store: " + self.store_name)
 
                 del potential_buys
-                return
             else:
                 # Customer decides to leave
-                self.__customer_leaves(customer)
                 if self.verbose:
                     print(customer.name + " decided to leave.")
-                return
+                if self.__recording is not None:
+                    self.__recording.add_event(self.current_minute, customer, dr.DayRecording.LEAVE)
+                return True
         else:
             # Customer leaves as they want nothing else
-            self.__customer_leaves(customer)
             if self.verbose:
                 print(customer.name + " doesnt want more.")
-            return
+            if self.__recording is not None:
+                self.__recording.add_event(self.current_minute, customer, dr.DayRecording.LEAVE)
+            return True
+
+        return False
+
+
+
+    def public_customer_buys(self, customer: cr.Customer, item_id: int) -> bool:
+        """
+        Public version of customer buys, used to make a customer try to buy a chosen item instead of a random one.
+        This should only be called with an input customer that is in the store.
+        """
+
+        if not self.check_if_name_in_store(customer.name):
+            raise ValueError("Customer '" + customer.name + "' is not in the store '" + self.store_name + "'.")
+
+        return self.__customer_buys(customer, self.get_row_index("Item Id", item_id))
+
+
+
+    def __customer_buys(self, customer: cr.Customer, row_index: int, purchases: tuple = None) -> bool:
+        """
+        Makes the input customer try to buy the item of the row index. Returns True if the item is bought.
+
+        purchases: Tuple of (customers, rows, prices, minutes) that a bought item is added to instead of the purchase log and sales analytics, which are then updated by __log_purchases. Used by the threads of concurrent mode.
+        """
+
+        # Take the item off the shelf before paying, another thread may have bought the last one
+        remaining_stock = self.__take_stock(row_index)
+
+        if remaining_stock < 0:
+            # The item sold out while the customer was deciding
+            customer.decrease_buy_attempts(1)
+            return False
+
+        # See if customer buys the item
+        # Will be true if the item is bought
+        # Price of the current action interval
+        price = self.__item_prices[row_index]
+
+        if purchases is None:
+            if customer.buy_item(self.__item_ids[row_index], price, self.current_minute):
+                self.sales_analytics.record_sale(row_index, price, self.current_minute, remaining_stock)
+                return True
+        elif customer.pay_for_item(price):
+            # The day loop thread logs the purchase, so threads do not wait on each other to log buys
+            purchases[0].append(customer)
+            purchases[1].append(row_index)
+            purchases[2].append(price)
+            purchases[3].append(self.current_minute)
+            return True
+
+        # Put the item back
+        self.__change_stock(row_index, 1)
+        return False
+
+
+
+    def apply_purchases(self, customers: list, rows: array, prices: array, minutes: array):
+        """
+        Adds purchases that were decided outside of the day loop, such as by the shards of a Sharded Day, to the stock, purchase log, and sales analytics at once instead of one buy at a time.
+
+        Purchase i is made by customers[i] of the item in rows[i] at prices[i] and minutes[i], in the order the purchases were made. Customers must be in the store, and their money is not changed.
+        This should not be called while customers are taking actions on other threads.
+        """
+
+        if self.__stock_shared:
+            self.__own_stock()
+
+        row_units = {}
+
+        for row_index in rows:
+            row_units[row_index] = row_units.get(row_index, 0) + 1
+
+        for row_index, units in row_units.items():
+            if units > self.__stock[row_index]:
+                raise ValueError("Item Id '" + str(self.__item_ids[row_index]) + "' does not have stock for " + str(units) + " purchases.")
+
+        for row_index, units in row_units.items():
+            self.__stock[row_index] = self.__stock[row_index] - units
+
+        self.__log_purchases(customers, rows, prices, minutes)
+
+
+
+    def __log_purchases(self, customers: list, rows: array, prices: array, minutes: array):
+        """
+        Adds purchases whose items are already out of the stock to the purchase log and sales analytics at once, see apply_purchases.
+        """
+
+        row_units = {}
+        row_revenue = {}
+        last_minutes = {}
+
+        handles = array("q")
+        previous = array("q")
+        index = len(self.purchase_log)
+
+        for row_index, price, minute in zip(rows, prices, minutes):
+            row_units[row_index] = row_units.get(row_index, 0) + 1
+            row_revenue[row_index] = row_revenue.get(row_index, 0.0) + price
+            last_minutes[row_index] = minute
+
+        # Link each purchase to the customer's purchase before it
+        for customer in customers:
+            handles.append(customer.purchase_handle)
+            previous.append(customer.purchase_head)
+            customer.purchase_head = index
+            index += 1
+
+        self.purchase_log.extend(handles, rows, prices, minutes, previous)
+
+        # Items that the purchases sold out are out of stock from their last purchase
+        sold_out_minutes = {}
+
+        for row_index in row_units:
+            if self.__stock[row_index] <= 0:
+                sold_out_minutes[row_index] = last_minutes[row_index]
+
+        self.sales_analytics.record_sales(row_units, row_revenue, sold_out_minutes)
+
+
+
+    def __customer_actions(self, customers: list, purchases: tuple = None) -> list:
+        """
+        Calls customer action for each customer in the input list and returns a list of the customers that leave.
+
+        purchases: Purchase buffer of the chunk in concurrent mode, see __customer_buys.
+        """
+
+        leaving = []
+
+        for customer in customers:
+            if self.__customer_action(customer, purchases):
+                leaving.append(customer)
+
+        return leaving
+
+
+
+    def __take_stock(self, row_index: int) -> int:
+        """
+        Removes one item from the stock of the row index and returns the remaining stock. Returns -1 if the item is out of stock.
+        """
+
+        if self.__stock_shared:
+            self.__own_stock()
+
+        with self.__stock_locks[row_index % StoreSimulator.STOCK_LOCK_STRIPES]:
+            if self.__stock[row_index] <= 0:
+                return -1
+
+            self.__stock[row_index] = self.__stock[row_index] - 1
+            return self.__stock[row_index]
+
+
+
+    def __change_stock(self, row_index: int, quantity: int) -> int:
+        """
+        Adds the inputted quantity to the stock of the row index and returns the new stock.
+        """
+
+        if self.__stock_shared:
+            self.__own_stock()
+
+        with self.__stock_locks[row_index % StoreSimulator.STOCK_LOCK_STRIPES]:
+            self.__stock[row_index] = round(self.__stock[row_index] + quantity)
+            return self.__stock[row_index]
+
+
+
+    def __own_stock(self):
+        """
+        Gives the store its own copy of a stock array that is shared with a fork, before the stock is changed.
+        """
+
+        with self.__stock_copy_lock:
+            if self.__stock_shared:
+                self.__stock = array("q", self.__stock)
+                self.__stock_shared = False
 
 
 
@@ -231,17 +512,118 @@ class StoreSimulator:
             # Loop through each customer and force them to leave
             for customer in self.customers_in_store.copy():
                 self.__customer_leaves(self.customers_in_store[customer])
+
+            self.sales_analytics.end_day(self.end_hour * 60, self.__stock)
+
+            if self.transaction_history is not None:
+                self.__save_day_history()
+
+            if self.metrics_exporter is not None:
+                self.metrics_exporter.record_day(self.store_name, len(self.customer_transactions))
+
             return False
 
-        # Loop through each customer in the store and call customer action for them
-        for customer in self.customers_in_store.copy():
-            self.__customer_action(self.customers_in_store[customer])
+        # Swap in the prices of this action interval
+        if self.__day_prices is not None:
+            self.__swap_prices()
+
+        customers = list(self.customers_in_store.values())
+        purchases_before = len(self.purchase_log)
+
+        # Call customer action for each customer in the store
+        if self.worker_threads > 1 and len(customers) > 1:
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(self.worker_threads)
+
+            # Split the customers into one chunk per thread, each with its own purchase buffer
+            chunk_size = -(-len(customers) // self.worker_threads)
+            chunks = [customers[i:i + chunk_size] for i in range(0, len(customers), chunk_size)]
+            buffers = [([], array("q"), array("d"), array("d")) for _ in chunks]
+            futures = [self.__executor.submit(self.__customer_actions, chunk, buffer) for chunk, buffer in zip(chunks, buffers)]
+            leaving = [future.result() for future in futures]
+
+            # Purchases are logged and customers leave in chunk order, so the purchase log, sales analytics, and transaction ids are changed by this thread only
+            for buffer in buffers:
+                self.__log_purchases(*buffer)
+
+            for chunk_leaving in leaving:
+                for customer in chunk_leaving:
+                    self.__customer_leaves(customer)
+        else:
+            for customer in self.__customer_actions(customers):
+                self.__customer_leaves(customer)
+
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.record_interval(self.store_name, self.action_interval_minutes, len(customers), len(self.purchase_log) - purchases_before, len(self.customers_in_store))
+
+        del customers
 
         # If the store is still open (current minutes is less than end time), then return true
         return True
 
 
 
+    def __swap_prices(self):
+        """
+        Points the item prices at the compiled prices of the current action interval.
+        """
+
+        interval = int((self.current_minute - self.start_hour * 60) // self.action_interval_minutes)
+        self.__item_prices = self.__day_prices[max(0, min(interval, len(self.__day_prices) - 1))]
+
+
+
+    def set_current_minute(self, minute: float):
+        """
+        Sets the current minute of the day and swaps in the prices of its action interval. This should only be called by code that runs the day loop itself, such as a Sharded Day.
+        """
+
+        self.current_minute = minute
+
+        if self.__day_prices is not None:
+            self.__swap_prices()
+
+
+
+    def get_day_prices(self) -> list:
+        """
+        Returns a list of the price arrays of each action interval of the current day, where index 0 is the interval at the opening hour. Has only the item list costs if there is no price schedule.
+
+        Intervals past the end of the list use the last array.
+        """
+
+        if self.__day_prices is not None:
+            return list(self.__day_prices)
+
+        return [self.__item_costs]
+
+
+
+    def shutdown_workers(self):
+        """
+        Stops the threads used in concurrent mode. They are started again if another action interval needs them.
+        """
+
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+
+
+    def set_action_chances(self, look_chance: float, buy_chance: float, leave_chance: float):
+        """
+        Sets the chances of a customer looking, buying, or leaving during an action interval. The chances should add up to 1.
+        """
+
+        if min(look_chance, buy_chance, leave_chance) < 0 or abs(look_chance + buy_chance + leave_chance - 1) > 1e-9:
+            raise ValueError("Action chances must not be negative and must add up to 1.")
+
+        self.look_chance = look_chance
+        self.buy_chance = buy_chance
+        self.leave_chance = leave_chance
+
+
+
     def start_new_day(self):
         """
         Resets data structures and increments day counter.
@@ -253,20 +635,32 @@ class StoreSimulator:
 
         self.customer_transactions = []
         self.customers_in_store = {}
+        self.purchase_log.clear()
 
         # Increase day counter
         self.day = self.day + 1
+        self.day_epoch = next(StoreSimulator.__day_epochs)
 
         # Reset current minutes
         self.current_minute = self.start_hour * 60
 
+        # Prices of every action interval are worked out before the day starts
+        if self.price_schedule is not None:
+            self.__day_prices = self.price_schedule.compile_day(self, self.day)
+            self.__item_prices = self.__day_prices[0]
+        else:
+            self.__day_prices = None
+            self.__item_prices = self.__item_costs
+
+        self.sales_analytics.start_day(self.day, self.current_minute, self.__stock)
+
 
     
     def simulate_one_day(self, customer_list: list = [], use_random_customers: bool = False, customer_enter_chance: float = 0.1, customer_enter_max: int = 3):
         """
         Simulates one day of operation for the store object.
 
-        customer_list: List of specific customers that should enter the store before any random customers.
+        customer_list: List of specific customers that should enter the store before any random customers. The list is not changed, and customers are reset when they enter.
 
         use_random_customers: Determines if the store should generate random customers if the customer_list is empty.
 
@@ -275,40 +669,399 @@ class StoreSimulator:
         customer_enter_max: The max amount of customers that can enter the store at any action interval.
         """
 
+        self.begin_day(customer_list, use_random_customers, customer_enter_chance, customer_enter_max)
+        self.run_until()
+
+
+
+    def begin_day(self, customer_list: list = [], use_random_customers: bool = False, customer_enter_chance: float = 0.1, customer_enter_max: int = 3):
+        """
+        Starts a day without running any action intervals, so the day can be run in parts with run_until. See simulate_one_day for the inputs.
+        """
+
         # Start a new day
         self.start_new_day()
 
-        print("Store: " + self.store_name + " Day " + str(self.day) + " begins.\n")
+        if not self.quiet:
+            print("Store: " + self.store_name + " Day " + str(self.day) + " begins.\n")
 
         # Allows customers to enter at the start hour
         self.current_minute = self.current_minute - self.action_interval_minutes
 
+        # Customers are drawn from customer_list without copying it
+        # Positions below remaining have not been drawn, and swapped holds the positions whose customer index is not their own
+        self.__day_customer_list = customer_list
+        self.__day_remaining = len(customer_list)
+        self.__day_swapped = {}
+
+        self.__day_use_random_customers = use_random_customers
+        self.__day_enter_chance = customer_enter_chance
+        self.__day_enter_max = customer_enter_max
+        self.__day_running = True
+
+
+
+    def run_until(self, end_time: str = None) -> bool:
+        """
+        Runs action intervals of the day started by begin_day. Returns True if the store is still open.
+
+        end_time: Time of day in the form of XX:XX. Stops before the first action interval at or after this time. Runs until the store closes if None.
+        """
+
+        end_minute = None if end_time is None else self.time_to_minutes(end_time)
+
         # Loop through the day
-        while(self.do_action_interval()):
-            # Check if customers enter
-            if rand.random() < customer_enter_chance:
-                customers_enter_count = rand.randint(1, customer_enter_max)
-
-                # Check how to add customers to the store
-                if len(customer_list) > customers_enter_count:
-                    # Add randomly generated amount of customers from customer list to store
-                    while(customers_enter_count > 0):
-                        self.customer_enters(customer_list.pop(rand.randint(0, len(customer_list) - 1)))
-                        customers_enter_count = customers_enter_count - 1
-                elif len(customer_list) != 0:
-                    # Add rest of customer list to store
-                    while(len(customer_list) > 0):
-                        self.customer_enters(customer_list.pop())
-                elif use_random_customers:
-                    # Add randomly generated customers to store
-                    while(customers_enter_count > 0):
-                        self.customer_enters(self.generate_random_customer())
-                        customers_enter_count = customers_enter_count - 1
-        
+        while(self.__day_running):
+            if end_minute is not None and self.current_minute + self.action_interval_minutes >= end_minute:
+                return True
+
+            if not self.do_action_interval():
+                self.__day_running = False
+                break
+
+            self.__customers_arrive()
+
         # Day is over
-        print("\nStore: " + self.store_name + " Day " + str(self.day) + " ends.")
+        if not self.quiet:
+            print("\nStore: " + self.store_name + " Day " + str(self.day) + " ends.")
+
+        # Customers that did not come are not needed anymore
+        self.__day_customer_list = []
+        self.__day_swapped = {}
 
-        del customer_list
+        return False
+
+
+
+    def __customers_arrive(self):
+        """
+        Randomly adds customers to the store at the end of an action interval of the day started by begin_day.
+        """
+
+        customer_list = self.__day_customer_list
+        swapped = self.__day_swapped
+
+        # Check if customers enter
+        if self.rng.random() < self.__day_enter_chance:
+            customers_enter_count = self.rng.randint(1, self.__day_enter_max)
+
+            # Check how to add customers to the store
+            if self.__day_remaining > customers_enter_count:
+                # Add randomly generated amount of customers from customer list to store
+                while(customers_enter_count > 0):
+                    self.customer_enters(customer_list[self.__draw_customer_index(swapped, self.__day_remaining, self.rng.randint(0, self.__day_remaining - 1))])
+                    self.__day_remaining = self.__day_remaining - 1
+                    customers_enter_count = customers_enter_count - 1
+            elif self.__day_remaining != 0:
+                # Add rest of customer list to store
+                while(self.__day_remaining > 0):
+                    self.customer_enters(customer_list[swapped.get(self.__day_remaining - 1, self.__day_remaining - 1)])
+                    self.__day_remaining = self.__day_remaining - 1
+            elif self.__day_use_random_customers:
+                # Add randomly generated customers to store
+                while(customers_enter_count > 0):
+                    self.customer_enters(self.generate_random_customer())
+                    customers_enter_count = customers_enter_count - 1
+
+
+
+    def fork(self, seed: int = None, store_name: str = None) -> "StoreSimulator":
+        """
+        Returns a branch of the store that continues from its current state, such as partway through a day started by begin_day. The branch and the store can be changed and run without changing each other.
+
+        Item list data, compiled prices, and finished transactions are shared, and the stock array is shared until either store changes it. Customers in the store are copied, and customers that enter the branch later are copied as they enter.
+        The branch has its own sales analytics, does not keep a stock or transaction history, and shares the output writer and metrics exporter.
+
+        seed: Seed of the branch's random number generator. A random seed is used if None.
+
+        store_name: Name of the branch for output files. Uses the store name followed by " Fork" and a number if None.
+        """
+
+        if self.__recording is not None:
+            raise ValueError("A store can not be forked while a day is being recorded.")
+
+        self.__fork_count += 1
+
+        output = copy.copy(self)
+
+        if store_name is None:
+            store_name = self.store_name + " Fork " + str(self.__fork_count)
+
+        output.store_name = store_name
+        output.rng = rand.Random(seed)
+
+        # Stock is copied by whichever store changes it first
+        self.__stock_shared = True
+        output.__stock_shared = True
+        output.__stock_locks = [threading.Lock() for _ in range(StoreSimulator.STOCK_LOCK_STRIPES)]
+        output.__stock_copy_lock = threading.Lock()
+
+        # Finished rows are never changed, so the lists are copied but the rows are shared
+        output.customer_transactions = list(self.customer_transactions)
+        output.purchase_log = self.purchase_log.copy()
+
+        # The branch gets its own day epoch, so customers that are shared with this store are reset when they enter the branch
+        output.day_epoch = next(StoreSimulator.__day_epochs)
+        output.customers_in_store = {}
+
+        for name, customer in self.customers_in_store.items():
+            customer = customer.copy()
+            customer.day_epoch = output.day_epoch
+            customer.purchase_log = output.purchase_log
+            output.customers_in_store[name] = customer
+
+        output.__copy_entering_customers = True
+        output.__day_swapped = dict(self.__day_swapped)
+
+        output.sales_analytics = self.sales_analytics.copy()
+        output.stock_history = None
+        output.transaction_history = None
+
+        output.__executor = None
+        output.__fork_count = 0
+
+        return output
+
+
+
+    def __draw_customer_index(self, swapped: dict, remaining: int, position: int) -> int:
+        """
+        Returns the customer index at an undrawn position and moves the last undrawn customer index into that position.
+
+        swapped: Dict of position to customer index for positions that do not hold their own index.
+
+        remaining: Number of undrawn positions.
+
+        position: Position being drawn, from 0 to remaining - 1.
+        """
+
+        output = swapped.get(position, position)
+        swapped[position] = swapped.pop(remaining - 1, remaining - 1)
+
+        return output
+
+
+
+    def record_one_day(self, customer_list: list = [], use_random_customers: bool = False, customer_enter_chance: float = 0.1, customer_enter_max: int = 3) -> dr.DayRecording:
+        """
+        Simulates one day like simulate_one_day and returns a Day Recording of its decisions, which can be given to replay_day.
+
+        Recording needs the store to run on one worker thread, so the order of decisions is fixed.
+        """
+
+        if self.worker_threads > 1:
+            raise ValueError("Days can only be recorded by a store with one worker thread.")
+
+        self.__recording = dr.DayRecording(self.__item_ids, self.__stock)
+
+        try:
+            self.simulate_one_day(customer_list, use_random_customers, customer_enter_chance, customer_enter_max)
+        finally:
+            recording = self.__recording
+            self.__recording = None
+
+        recording.finish(self.current_minute, self.day, self.__day_prices)
+
+        return recording
+
+
+
+    def replay_day(self, recording: dr.DayRecording, stock_overrides: dict = None, price_overrides: dict = None, seed: int = None):
+        """
+        Simulates a new day that repeats the decisions of a recorded day, starting from the recorded opening stock.
+
+        Customers enter, look, and leave as recorded. Buys choose the recorded item again while it is in stock and the customer can pay for it, and only choose again at random from the items the customer could buy when it is not, so buys that a change does not affect stay the same.
+        A customer that finds nothing to buy leaves early, and a customer that left because they found nothing to buy but now finds something stays and makes new random decisions.
+
+        Looks are skipped, so a replay does much less work than simulating the day again.
+
+        The replay is a new day of this store. The stock is replaced by the recorded opening stock, the day counter moves on, and sales analytics, stock history, and transaction history count it like any other day. Replay on a fork to leave the store as it was.
+
+        stock_overrides: Dict of item id to the stock it starts the day with instead of the recorded stock.
+
+        price_overrides: Dict of item id to the price it is sold at for the whole day.
+
+        seed: Seed of the random decisions made when a recorded item can not be bought or the recorded decisions run out. Uses rng if None.
+        """
+
+        if len(recording.item_ids) != len(self.__item_ids) or recording.item_ids != list(self.__item_ids):
+            raise ValueError("Recording was made with a different item list.")
+
+        # Start from the recorded opening stock
+        stock = array("q", recording.opening_stock)
+
+        if stock_overrides is not None:
+            for item_id, quantity in stock_overrides.items():
+                stock[self.get_row_index("Item Id", item_id)] = quantity
+
+        self.__stock = stock
+        self.__stock_shared = False
+
+        self.start_new_day()
+
+        if not self.quiet:
+            print("Store: " + self.store_name + " Day " + str(self.day) + " begins.\n")
+
+        # Prices are the ones compiled for the recorded day, the price schedule may give the new day other prices
+        if recording.day_prices is not None:
+            self.__day_prices = list(recording.day_prices)
+            self.__item_prices = self.__day_prices[0]
+        else:
+            self.__day_prices = None
+            self.__item_prices = self.__item_costs
+
+        # Prices are overridden in copies of the compiled price arrays, keeping arrays shared between intervals shared
+        if price_overrides is not None:
+            day_prices = self.__day_prices if self.__day_prices is not None else [self.__item_costs]
+            copies = {}
+
+            for prices in day_prices:
+                if id(prices) not in copies:
+                    copies[id(prices)] = array("d", prices)
+
+                    for item_id, price in price_overrides.items():
+                        copies[id(prices)][self.get_row_index("Item Id", item_id)] = price
+
+            self.__day_prices = [copies[id(prices)] for prices in day_prices]
+            self.__item_prices = self.__day_prices[0]
+
+        old_rng = self.rng
+        if seed is not None:
+            self.rng = rand.Random(seed)
+
+        # State of each recorded customer, customers that have not entered are 0
+        FOLLOWING = 1
+        LIVE = 2
+        LEFT = 3
+        LEFT_EARLY = 4
+
+        # Replaced by the customer objects that enter, which are copies in a fork
+        customers = list(recording.customers)
+        customer_states = bytearray(len(customers))
+
+        # Customers making new decisions, customers that start making new decisions next action interval, and customers that leave after the current action interval
+        live = []
+        joining = []
+        leaving = []
+
+        # Potential buys of each tag mask, cleared when an item sells out
+        potential_buys_cache = {}
+
+        try:
+            actions_done = False
+
+            for event in range(recording.get_event_count()):
+                minute = recording.event_minutes[event]
+
+                # Move to the action interval of the event
+                while(self.current_minute < minute):
+                    if not actions_done:
+                        self.__replay_end_actions(live, joining, leaving, potential_buys_cache)
+                    self.current_minute = self.current_minute + self.action_interval_minutes
+                    actions_done = False
+                    if self.__day_prices is not None:
+                        self.__swap_prices()
+
+                customer_index = recording.event_customers[event]
+                customer = customers[customer_index]
+                kind = recording.event_kinds[event]
+
+                if kind == dr.DayRecording.ENTER:
+                    # Customers enter after the actions of the interval
+                    if not actions_done:
+                        self.__replay_end_actions(live, joining, leaving, potential_buys_cache)
+                        actions_done = True
+
+                    customers[customer_index] = self.customer_enters(customer)
+                    customer_states[customer_index] = FOLLOWING
+                    continue
+
+                if customer_states[customer_index] != FOLLOWING:
+                    continue
+
+                if kind == dr.DayRecording.LEAVE:
+                    leaving.append(customer)
+                    customer_states[customer_index] = LEFT
+                    continue
+
+                # Buy
+                row_index = recording.event_rows[event]
+
+                # The recorded item is chosen again if it can still be bought, so only buys that a change affects choose again
+                # A refused buy is repeated while the item is in stock, as the customer could not pay for it when recorded either
+                if kind == dr.DayRecording.EMPTY_BUY or self.__stock[row_index] <= 0 or (kind == dr.DayRecording.BUY and self.__item_prices[row_index] > customer.money and not customer.using_credit):
+                    if customer.tag_mask not in potential_buys_cache:
+                        potential_buys_cache[customer.tag_mask] = self.__get_customer_potential_buys(customer)
+                    potential_buys = potential_buys_cache[customer.tag_mask]
+
+                    if len(potential_buys) == 0:
+                        # Nothing to buy anymore, so the customer leaves with the buy attempts they had
+                        customer.max_buy_attempts = recording.event_attempts[event]
+                        leaving.append(customer)
+                        customer_states[customer_index] = LEFT_EARLY
+                        continue
+
+                    row_index = potential_buys[self.rng.randint(0, len(potential_buys) - 1)]
+
+                    if kind == dr.DayRecording.EMPTY_BUY:
+                        # The customer left here when recorded, so their decisions from now on are new
+                        customer.max_buy_attempts = recording.event_attempts[event]
+                        joining.append(customer)
+                        customer_states[customer_index] = LIVE
+
+                self.__customer_buys(customer, row_index)
+
+                if self.__stock[row_index] <= 0:
+                    potential_buys_cache.clear()
+
+            # Run the action intervals left before the store closes
+            while(True):
+                if not actions_done:
+                    self.__replay_end_actions(live, joining, leaving, potential_buys_cache)
+
+                if self.current_minute + self.action_interval_minutes >= recording.close_minute:
+                    break
+
+                self.current_minute = self.current_minute + self.action_interval_minutes
+                actions_done = False
+                if self.__day_prices is not None:
+                    self.__swap_prices()
+
+            # Customers that followed the recording end with the recorded buy attempts
+            for customer_index, customer in enumerate(customers):
+                if customer_states[customer_index] in (FOLLOWING, LEFT):
+                    customer.max_buy_attempts = recording.final_attempts[customer_index]
+
+            # Close the store
+            self.do_action_interval()
+        finally:
+            self.rng = old_rng
+
+        if not self.quiet:
+            print("\nStore: " + self.store_name + " Day " + str(self.day) + " ends.")
+
+
+
+    def __replay_end_actions(self, live: list, joining: list, leaving: list, potential_buys_cache: dict):
+        """
+        Ends the actions of an action interval of a replay. Customers making new decisions take their action, then every leaving customer leaves.
+        """
+
+        if len(live) > 0:
+            for customer in list(live):
+                if self.__customer_action(customer):
+                    live.remove(customer)
+                    leaving.append(customer)
+
+            potential_buys_cache.clear()
+
+        live.extend(joining)
+        joining.clear()
+
+        for customer in leaving:
+            self.__customer_leaves(customer)
+
+        leaving.clear()
 
 
 
@@ -326,14 +1079,14 @@ class StoreSimulator:
 
         # Determine how many tags to give the customer from 1 to half of the tags avaliable
         # Note: randomly generated customers cannot have the "Any" tag
-        tag_count = rand.randint(1, int(len(self.item_group_names) / 2))
+        tag_count = self.rng.randint(1, int(len(self.item_group_names) / 2))
 
         new_tags = []
 
         # Give tags to customer
         for _ in range(tag_count):
             # Get index of random tag
-            index = rand.randint(0, len(self.item_group_names) - 1)
+            index = self.rng.randint(0, len(self.item_group_names) - 1)
 
             tag = self.item_group_names[index]
 
@@ -342,17 +1095,33 @@ class StoreSimulator:
                 new_tags.append(tag)
 
         customer.set_tags(new_tags)
+        customer.set_tag_mask(self.encode_tags(new_tags), self.tag_codes)
         del new_tags
 
-        customer.set_money(rand.random() * money_multiplier + 5.00)
-        customer.set_max_buy_attempts(rand.random() * max_items_multiplier + 1)
+        customer.set_money(self.rng.random() * money_multiplier + 5.00)
+        customer.set_max_buy_attempts(self.rng.random() * max_items_multiplier + 1)
 
-        if rand.random() >= 0.5:
+        if self.rng.random() >= 0.5:
             customer.using_credit = True
         else:
             customer.using_credit = False
 
         return customer
+
+
+
+    def create_random_customer_list(self, customer_count: int = 100, max_money: int = 500, max_items: int = 10) -> list:
+        """
+        Returns a list of random customers for the store, see generate_random_customer.
+
+        customer_count: Number of customers to create.
+
+        max_money: Money multiplier of each customer.
+
+        max_items: Max items multiplier of each customer.
+        """
+
+        return [self.generate_random_customer(max_money, max_items) for _ in range(customer_count)]
     
 
 
@@ -364,12 +1133,11 @@ class StoreSimulator:
         # Make the name of the file
         output_file_name = self.store_name + " Day " + str(self.day) + " Transactions.csv"
 
-        self.__makes_dirs()
-
-        output_file_path = os.path.join(StoreSimulator.OUTPUT_DIR_NAME, self.store_name, output_file_name)
+        output_file_path = self.get_output_path(output_file_name)
 
         # Make or overwrite the output file
-        pd.DataFrame(self.customer_transactions, columns=["Transaction Id", "Customer Name", "Items", "Money Spent", "Time Entered", "Time Left"]).to_csv(output_file_path, index=False)
+        # Rows are never changed after a customer leaves, so a shallow copy is enough for a background write
+        self.__write_csv(output_file_path, StoreSimulator.TRANSACTION_COLUMNS, list(self.customer_transactions))
 
         del output_file_name
         del output_file_path
@@ -379,23 +1147,132 @@ class StoreSimulator:
     def output_stock(self, title_ending_message: str = " After Day"):
         """
         Outputs item database to a directory specific to the store.
+
+        If stock history is enabled, only the changed stock is appended to the store's stock history csv instead.
         """
 
+        if self.stock_history is not None:
+            self.stock_history.record(self.day, title_ending_message.strip(), self.__stock)
+            self.__write_csv(self.get_output_path(self.store_name + " Stock History.csv"), sh.StockHistory.COLUMNS, self.stock_history.get_new_rows(), True)
+            return
+
         # Make the name of the file
         output_file_name = self.store_name + " Day " + str(self.day) + " Stock" + title_ending_message + ".csv"
 
-        self.__makes_dirs()
-
-        output_file_path = os.path.join(StoreSimulator.OUTPUT_DIR_NAME, self.store_name, output_file_name)
+        output_file_path = self.get_output_path(output_file_name)
 
         # Make or overwrite the output file
-        self.item_dataframe.to_csv(output_file_path, index=False)
+        # The item list columns are replaced rather than changed, so only the stock needs to be copied for a background write
+        item_columns = self.item_columns
+        item_data = self.__item_data
+        stock = array("q", self.__stock)
+
+        self.__write_csv(output_file_path, item_columns, lambda: StoreSimulator.__get_rows(item_columns, item_data, stock, range(len(stock))))
 
         del output_file_name
         del output_file_path
 
 
 
+    def enable_stock_history(self, keyframe_interval: int = 7, continue_history: bool = False):
+        """
+        Makes output_stock record stock changes in a stock history instead of writing the whole item list.
+
+        keyframe_interval: Number of days between full copies of the stock in the history.
+
+        continue_history: Loads the entries of an existing stock history file so new entries are added after them. The file is replaced if False.
+        """
+
+        history_path = self.get_output_path(self.store_name + " Stock History.csv")
+
+        # Entries waiting to be appended have to be in the file before it is read or replaced
+        if self.output_writer is not None:
+            self.output_writer.flush()
+
+        if continue_history and os.path.exists(history_path) and os.path.getsize(history_path) > 0:
+            history = sh.StockHistory.load(history_path, keyframe_interval, list(self.__item_ids))
+
+            if history.item_ids != list(self.__item_ids):
+                raise ValueError("Stock history file '" + history_path + "' was made with a different item list.")
+
+            if len(history.entry_days) > 0 and history.entry_days[-1] > self.day:
+                raise ValueError("Stock history file '" + history_path + "' has entries after day " + str(self.day) + ".")
+
+            self.stock_history = history
+        else:
+            # Appending to an old file would mix its days with the new ones
+            if os.path.exists(history_path):
+                os.remove(history_path)
+
+            self.stock_history = sh.StockHistory(self.__item_ids, keyframe_interval)
+
+
+
+    def enable_transaction_history(self, database_path: str = None):
+        """
+        Saves the transactions and purchases of each day to an SQLite database when the store closes, so past days can be searched.
+
+        database_path: Path of the database. Uses "<store name> History.sqlite3" in the store's directory if None. The database is kept by clear_store_directory.
+        """
+
+        if database_path is None:
+            database_path = self.get_output_path(self.store_name + " History.sqlite3")
+
+        self.close_transaction_history()
+        self.transaction_history = th.TransactionHistory(database_path)
+
+
+
+    def close_transaction_history(self):
+        """
+        Closes the transaction history database, if there is one, and stops saving days to it.
+        """
+
+        if self.transaction_history is not None:
+            self.transaction_history.close()
+            self.transaction_history = None
+
+
+
+    def get_customer_purchase_history(self, customer_name: str, first_day: int = None, last_day: int = None) -> list:
+        """
+        Returns a list of (day, item id, price, time) for each item a customer bought in the transaction history.
+
+        first_day: Earliest day to include. Includes every day if None.
+
+        last_day: Latest day to include. Includes every day if None.
+        """
+
+        self.__check_transaction_history()
+
+        return [(day, item_id, price, self.minutes_to_time(minute)) for day, item_id, price, minute
+                in self.transaction_history.get_customer_purchases(self.store_name, customer_name, first_day, last_day)]
+
+
+
+    def get_item_sales_history(self, item_id: int, first_day: int = None, last_day: int = None, start_time: str = None, end_time: str = None) -> list:
+        """
+        Returns a list of (day, customer name, price, time) for each sale of an item in the transaction history.
+
+        first_day: Earliest day to include. Includes every day if None.
+
+        last_day: Latest day to include. Includes every day if None.
+
+        start_time: Earliest time of day to include in the form of XX:XX, such as "9:00". Includes the whole day if None.
+
+        end_time: Latest time of day to include in the form of XX:XX. Includes the whole day if None.
+        """
+
+        self.__check_transaction_history()
+
+        start_minute = None if start_time is None else self.time_to_minutes(start_time)
+        end_minute = None if end_time is None else self.time_to_minutes(end_time)
+
+        return [(day, customer_name, price, self.minutes_to_time(minute)) for day, customer_name, price, minute
+                in self.transaction_history.get_item_sales(self.store_name, item_id, first_day, last_day, start_minute, end_minute)]
+
+
+
     def add_stock(self, item_id: int, quantity: int = 20):
         """
         Adds the inputted quantity to the stock of the inputted item id.
@@ -405,16 +1282,11 @@ class StoreSimulator:
         quantity: Number to add to the item's stock.
         """
 
-        # Get row index of item
-        row_idex = self.get_row_index("Item Id", item_id)
-
-        # Get current stock of item
-        current_stock = self.item_dataframe.at[row_idex, "Stock"]
-        
         # Add quantity to the item stock
-        self.item_dataframe.at[row_idex, "Stock"] = round(current_stock + quantity)
+        row_index = self.__item_rows[item_id]
+        new_stock = self.__change_stock(row_index, quantity)
 
-        del current_stock
+        self.sales_analytics.record_stock_change(row_index, self.current_minute, round(quantity), new_stock)
 
 
 
@@ -423,19 +1295,52 @@ class StoreSimulator:
         Returns stock of the inputted item id.
         """
 
-        return self.item_dataframe.at[self.get_row_index("Item Id", item_id), "Stock"]
+        return self.__stock[self.__item_rows[item_id]]
 
 
 
-    def get_low_stock(self, stock_threshold: int = 10) -> pd.DataFrame:
+    def get_item_price(self, item_id: int) -> float:
+        """
+        Returns the price of the inputted item id in the current action interval, which is its cost unless a price schedule changes it.
+        """
+
+        return self.__item_prices[self.__item_rows[item_id]]
+
+
+
+    def get_low_stock(self, stock_threshold: int = 10) -> "pandas.DataFrame":
         """
         Returns a dataframe of all items at or below the stock threshold.
         """
 
-        return self.item_dataframe.loc[self.item_dataframe["Stock"] <= stock_threshold]
+        return self.__get_item_dataframe([row_index for row_index in range(len(self.__stock)) if self.__stock[row_index] <= stock_threshold])
     
 
 
+    def get_catalog_arrays(self) -> dict:
+        """
+        Returns a dict of copies of the per row item list data used by the simulation, with the keys "Item Id", "Cost (USD)", "Weight", "Stock", and "Tag Mask".
+        """
+
+        return {
+            "Item Id": list(self.__item_ids),
+            "Cost (USD)": array("d", self.__item_costs),
+            "Weight": array("q", self.__item_weights),
+            "Stock": array("q", self.__stock),
+            "Tag Mask": list(self.__item_tag_masks),
+        }
+
+
+
+    def get_low_stock_ids(self, stock_threshold: int = 10) -> list:
+        """
+        Returns a list of the item ids of all items at or below the stock threshold.
+        """
+
+        return [self.__item_ids[row_index] for row_index in range(len(self.__stock)) if self.__stock[row_index] <= stock_threshold]
+
+
+
     def output_updated_stock(self):
         """
         Creates a specific csv file. Meant to be called after updating stock.
@@ -452,27 +1357,45 @@ class StoreSimulator:
         item_list_path: Path to the new item list. See "ItemList.csv" for an example of correct formatting.
         """
 
-        self.item_dataframe = pd.read_csv(item_list_path)
+        with open(item_list_path, newline="") as item_file:
+            reader = csv.reader(item_file)
+            self.item_columns = next(reader)
+            rows = list(reader)
+
+        for column_name in StoreSimulator.REQUIRED_COLUMNS:
+            if column_name not in self.item_columns:
+                raise SyntaxError("Item list '" + item_list_path + "' is missing the column '" + column_name + "'.")
+
+        # Store the item list by column, converting each column to ints or floats when every value allows it
+        self.__item_data = {}
+
+        for column_index, column_name in enumerate(self.item_columns):
+            values = [row[column_index] for row in rows]
+
+            if column_name == "Tags":
+                # Translates the tags into a list
+                self.__item_data[column_name] = [literal_eval(value) for value in values]
+            else:
+                self.__item_data[column_name] = self.__parse_column(values)
+
+        del rows
 
         # Check if each item has a unique item id
 
         temp = set()
 
-        for row in self.item_dataframe.iterrows():
-            if row[1]["Item Id"] in temp:
-                raise SyntaxError("Item Id '" + str(row[1]["Item Id"]) + "' occurs multiple times. Each Id must be unique.\n\nDuplicate Item Id Entry:\n\n" + str(row[1]))
+        for row_index, item_id in enumerate(self.__item_data["Item Id"]):
+            if item_id in temp:
+                raise SyntaxError("Item Id '" + str(item_id) + "' occurs multiple times. Each Id must be unique.\n\nDuplicate Item Id Entry:\n\n"
+                                  + "\n".join(column_name + ": " + str(self.__item_data[column_name][row_index]) for column_name in self.item_columns))
             else:
-                temp.add(row[1]["Item Id"])
+                temp.add(item_id)
         
         del temp
-        
-        # Translates the tags into a list
-
-        temp = 0
 
-        for row in self.item_dataframe["Tags"].copy():
-            self.item_dataframe.at[temp, "Tags"] = literal_eval(row)
-            temp = temp + 1
+        # Stock of each row, guarded by the stock locks
+        self.__stock = array("q", self.__item_data["Stock"])
+        self.__stock_shared = False
 
         # Set up data structures related to item list
 
@@ -482,6 +1405,16 @@ class StoreSimulator:
         self.__init_item_groups()
 
 
+
+    @property
+    def item_dataframe(self) -> "pandas.DataFrame":
+        """
+        A pandas dataframe of the item list with the current stock. A new dataframe is made on every access, so changes to it do not change the store.
+        """
+
+        return self.__get_item_dataframe(range(len(self.__stock)))
+
+
     
     def check_if_name_in_store(self, name: str) -> bool:
         """
@@ -511,18 +1444,29 @@ class StoreSimulator:
         Deletes all items in the store's directory in OUTPUT_DIR_NAME
         """
 
+        # Files waiting to be written would otherwise be made after the directory is cleared
+        if self.output_writer is not None:
+            self.output_writer.flush()
+
         files = glob.glob(StoreSimulator.OUTPUT_DIR_NAME + "/" + self.store_name + "/*.csv")
         for f in files:
             os.remove(f)
+
+        # The stock history file is gone, so it has to start again with a keyframe
+        if self.stock_history is not None:
+            self.stock_history.force_keyframe()
     
 
 
-    def get_item(self, item_id: int) -> pd.DataFrame:
+    def get_item(self, item_id: int) -> "pandas.DataFrame":
         """
         Returns an entry from the item dataframe of the inputted item id.
         """
 
-        return self.item_dataframe.loc[self.item_dataframe["Item Id"] == item_id]
+        if item_id in self.__item_rows:
+            return self.__get_item_dataframe([self.__item_rows[item_id]])
+
+        return self.__get_item_dataframe([])
     
 
 
@@ -535,7 +1479,21 @@ class StoreSimulator:
             return str(int(minutes / 60)) + ":0" + str(int(minutes % 60))
         else:
             return str(int(minutes / 60)) + ":" + str(int(minutes % 60))
-        
+
+
+
+    def time_to_minutes(self, time: str) -> int:
+        """
+        Returns the minutes of a string in the form of XX:XX. Opposite of minutes_to_time.
+        """
+
+        parts = time.split(":")
+
+        if len(parts) != 2 or not parts[0].strip().isdigit() or not parts[1].strip().isdigit():
+            raise ValueError("'" + time + "' is not a time in the form of XX:XX.")
+
+        return int(parts[0]) * 60 + int(parts[1])
+
 
     
     def get_row_index(self, column_name: str, search_item) -> int:
@@ -545,10 +1503,130 @@ class StoreSimulator:
         Does not work for any column that is a list-like structure.
         """
 
-        return self.item_dataframe[self.item_dataframe[column_name] == search_item].index[0]
-        
+        if column_name == "Item Id":
+            if search_item in self.__item_rows:
+                return self.__item_rows[search_item]
+        else:
+            column = self.__stock if column_name == "Stock" else self.__item_data[column_name]
+
+            for row_index in range(len(column)):
+                if column[row_index] == search_item:
+                    return row_index
+
+        raise IndexError("'" + str(search_item) + "' is not in the column '" + column_name + "'.")
+
+
+
+    def __parse_column(self, values: list) -> list:
+        """
+        Returns a column of csv values as ints if every value is an int, as floats if every value is a number, and as strings otherwise.
+        """
+
+        for convert in (int, float):
+            try:
+                return [convert(value) for value in values]
+            except ValueError:
+                pass
+
+        return values
+
+
+
+    def __get_item_rows(self, row_indices) -> list:
+        """
+        Returns a list of item list rows with the current stock, with values in the order of item_columns.
+        """
+
+        return StoreSimulator.__get_rows(self.item_columns, self.__item_data, self.__stock, row_indices)
+
+
+
+    @staticmethod
+    def __get_rows(item_columns: list, item_data: dict, stock: array, row_indices) -> list:
+        """
+        Returns a list of item list rows built from item data columns and a stock array.
+        """
+
+        columns = [stock if column_name == "Stock" else item_data[column_name] for column_name in item_columns]
+
+        return [[column[row_index] for column in columns] for row_index in row_indices]
+
+
+
+    def __get_item_dataframe(self, row_indices) -> "pandas.DataFrame":
+        """
+        Returns a pandas dataframe of the rows of the item list, indexed by row index. Pandas is only imported when a dataframe is needed.
+        """
+
+        import pandas as pd
+
+        row_indices = list(row_indices)
+
+        return pd.DataFrame(self.__get_item_rows(row_indices), index=row_indices, columns=self.item_columns)
+
+
+
+    def __write_csv(self, output_file_path: str, columns: list, rows, append: bool = False):
+        """
+        Makes or overwrites a csv file with a header row of columns followed by the rows. The file is handed to the output writer if the store has one.
+
+        rows: A list of rows, or a function that returns a list of rows.
+
+        append: Adds the rows to the end of the file instead. The header row is only written if the file is new.
+        """
+
+        if self.output_writer is not None:
+            self.output_writer.write_csv(output_file_path, columns, rows, append)
+            return
+
+        if callable(rows):
+            rows = rows()
+
+        write_header = not append or not os.path.exists(output_file_path) or os.path.getsize(output_file_path) == 0
+
+        with open(output_file_path, "a" if append else "w", newline="") as output_file:
+            writer = csv.writer(output_file, lineterminator=os.linesep)
+            if write_header:
+                writer.writerow(columns)
+            writer.writerows(rows)
+
+
+
+    def __save_day_history(self):
+        """
+        Saves the transactions and purchases of the current day to the transaction history.
+        """
+
+        # Times are saved as minutes so they can be searched by range
+        transactions = [row[:4] + [self.time_to_minutes(row[4]), self.time_to_minutes(row[5])] for row in self.customer_transactions]
+
+        self.transaction_history.record_day(self.store_name, self.day, transactions, self.purchase_log.get_rows())
+
+        del transactions
+
+
+
+    def __check_transaction_history(self):
+        """
+        Raises an error if the store does not have a transaction history.
+        """
+
+        if self.transaction_history is None:
+            raise ValueError("Store '" + self.store_name + "' does not have a transaction history. Call enable_transaction_history first.")
+
+
+
+    def get_output_path(self, output_file_name: str) -> str:
+        """
+        Returns the path of an output file in the store's directory in OUTPUT_DIR_NAME. The directory is made if it does not exist.
+        """
+
+        self.__makes_dirs()
+
+        return os.path.join(StoreSimulator.OUTPUT_DIR_NAME, self.store_name, output_file_name)
+
+
 
-    
     def __makes_dirs(self):
         """
         Make directories for output files.
@@ -569,28 +1647,35 @@ class StoreSimulator:
             pass
 
 
-    def __translate_items_bought(self, customer_dict: dict, include_item_name: bool = False) -> list:
+    def __translate_items_bought(self, customer: cr.Customer, include_item_name: bool = False, include_paid: bool = False) -> list:
         """
         Returns a list of all items a customer bought
 
-        customer_dict: This is the items_bought field of a Customer object.
+        customer: Customer whose items are taken from the purchase log.
 
         include_item_name: Determines if the name of an item should be included in the list.
+
+        include_paid: Determines if the total paid for each item should be included in the list.
         """
 
         output = []
-        name_column = self.item_dataframe.Name
+        name_column = self.__item_data["Name"]
 
         # Create a list of all items bought so all bought items can be stored in a single column
+        for item_id, count, paid in customer.get_purchases():
+            entry = "Id:" + str(item_id)
 
-        if include_item_name:
             # Includes item name in the items column
-            for key in customer_dict:
-                output.append("Id:" + str(key) + " Name:" + name_column[key] + " Num:" + str(customer_dict[key]))
-        else:
-            # Only has id and quantity
-            for key in customer_dict:
-                output.append("Id:" + str(key) + " Num:" + str(customer_dict[key]))
+            if include_item_name:
+                entry = entry + " Name:" + name_column[self.__item_rows[item_id]]
+
+            entry = entry + " Num:" + str(count)
+
+            # Add the price actually paid, which can differ from the item list cost
+            if include_paid:
+                entry = entry + " Paid:" + "{:.2f}".format(paid)
+
+            output.append(entry)
         
         del name_column
 
@@ -600,68 +1685,91 @@ class StoreSimulator:
 
     def __init_item_groups(self):
         """
-        Initializes item_group related fields based on the item_dataframe.
+        Initializes item_group related fields based on the item list.
+
+        Tags are also interned to bit positions in tag_codes so that item and customer tags can be matched with bitwise operations.
         """
 
         # Set up the "Any" group
         self.item_groups["Any"] = set()
 
-        # Initialize item groups by going through entire item dataframe
-        for row in self.item_dataframe.iterrows():
+        # "Any" is always bit 0 and every item carries it, so a customer with "Any" matches every item
+        self.tag_codes = {"Any": 0}
+
+        # Per row data used when building potential buys, in the same order as the item list
+        self.__item_ids = self.__item_data["Item Id"]
+        self.__item_costs = array("d", self.__item_data["Cost (USD)"])
+        self.__item_prices = self.__item_costs
+        self.__day_prices = None
+        self.__item_weights = array("q", self.__item_data["Weight"])
+        self.__item_tag_masks = []
+        self.__item_rows = {}
+
+        # Initialize item groups by going through entire item list
+        for row_index, item_id in enumerate(self.__item_ids):
             # Add each item to the "Any" group
-            self.item_groups["Any"].add(row[1]["Item Id"])
+            self.item_groups["Any"].add(item_id)
+
+            tag_mask = 1
 
             # Check each tag in any item
-            for tag_str in row[1]["Tags"]:
+            for tag_str in self.__item_data["Tags"][row_index]:
                 if tag_str in self.item_groups:
-                    self.item_groups[tag_str].add(row[1]["Item Id"])
+                    self.item_groups[tag_str].add(item_id)
                 else:
-                    self.item_groups[tag_str] = {row[1]["Item Id"]}
+                    self.item_groups[tag_str] = {item_id}
                     self.item_group_names.append(tag_str)
 
+                # Give each new tag the next free bit
+                if tag_str not in self.tag_codes:
+                    self.tag_codes[tag_str] = len(self.tag_codes)
+
+                tag_mask = tag_mask | (1 << self.tag_codes[tag_str])
+
+            self.__item_rows[item_id] = row_index
+            self.__item_tag_masks.append(tag_mask)
+
+        # Sales counters, purchases, and stock history are kept per row, so they start over with a new item list
+        self.sales_analytics = sa.SalesAnalytics(self.__item_ids, self.__item_data["Vendor"], self.__item_data["Tags"])
+        self.purchase_log = pl.PurchaseLog(self.__item_ids)
+
+        if self.stock_history is not None:
+            self.stock_history = sh.StockHistory(self.__item_ids, self.stock_history.keyframe_interval)
+
 
 
     def __get_customer_potential_buys(self, customer: cr.Customer) -> list:
         """
-        Returns a list of lists where [0] is an item id and [1] is the item cost.
+        Returns a list of row indices of the item list that the customer could buy. Each row appears once per point of item weight.
         """
 
-        # Add every item in the input dataframe into a list
         output = []
 
-        if "Any" in customer.item_tags:
-            # Transverse the dataframe
-            for row in self.item_dataframe.iterrows():
-                if row[1]["Stock"] > 0:
-                    for _ in range(0, row[1]["Weight"]):
-                        output.append([row[1]["Item Id"], row[1]["Cost (USD)"]])
-        else:
-            # Create set using item groups to determine potential buys
-            items_to_loc = set()
+        customer_mask = customer.tag_mask
+        stock = self.__stock
 
-            # Get all ids of the wanted items
-            for customer_tag in customer.item_tags:
-                items_to_loc = items_to_loc.union(self.item_groups[customer_tag])
+        # An item is wanted if it shares at least one tag bit with the customer
+        for row_index, item_mask in enumerate(self.__item_tag_masks):
+            if item_mask & customer_mask and stock[row_index] > 0:
+                for _ in range(0, self.__item_weights[row_index]):
+                    output.append(row_index)
 
-            # Check if the set is empty
-            if len(items_to_loc) == 0:
-                # The customer's tags do not match with anything in the item list, so they leave
-                del items_to_loc
-                return []
+        return output
 
-            # Get the rows from the item dataframe of the wanted items
-            items = self.item_dataframe.loc[self.item_dataframe["Item Id"].isin(items_to_loc)]
 
-            # Transverse the dataframe
-            for row in items.iterrows():
-                if row[1]["Stock"] > 0:
-                    for _ in range(0, row[1]["Weight"]):
-                        output.append([row[1]["Item Id"], row[1]["Cost (USD)"]])
 
-            del items
-            del items_to_loc
+    def encode_tags(self, tags: list) -> int:
+        """
+        Returns the bitmask of the inputted tags using the store's tag codes. Tags that no item has are ignored.
+        """
 
-        return output
+        tag_mask = 0
+
+        for tag_str in tags:
+            if tag_str in self.tag_codes:
+                tag_mask = tag_mask | (1 << self.tag_codes[tag_str])
+
+        return tag_mask
 
 
 
@@ -0,0 +1,148 @@
+import sqlite3
+
+class TransactionHistory:
+    # Tables and indexes of a transaction history database
+    SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS transactions (store TEXT NOT NULL, day INTEGER NOT NULL, transaction_id INTEGER NOT NULL, customer TEXT NOT NULL, "
+        "items TEXT NOT NULL, money_spent REAL NOT NULL, time_entered INTEGER NOT NULL, time_left INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS purchases (store TEXT NOT NULL, day INTEGER NOT NULL, customer TEXT NOT NULL, item_id INTEGER NOT NULL, "
+        "price REAL NOT NULL, minute INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS transactions_by_day ON transactions (store, day)",
+        "CREATE INDEX IF NOT EXISTS transactions_by_customer ON transactions (store, customer, day)",
+        "CREATE INDEX IF NOT EXISTS purchases_by_day ON purchases (store, day, minute)",
+        "CREATE INDEX IF NOT EXISTS purchases_by_customer ON purchases (store, customer, day, minute)",
+        "CREATE INDEX IF NOT EXISTS purchases_by_item ON purchases (store, item_id, day, minute)",
+    ]
+
+
+    def __init__(self, database_path: str):
+        """
+        Initializes a Transaction History object, which keeps the transactions and purchases of every day in an SQLite database.
+
+        database_path: Path of the database file. It is made if it does not exist.
+        """
+
+        self.database_path = database_path
+
+        self.connection = sqlite3.connect(database_path)
+
+        # Write ahead logging lets the history be read while a day is being written
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+        with self.connection:
+            for statement in TransactionHistory.SCHEMA:
+                self.connection.execute(statement)
+
+
+
+    def record_day(self, store_name: str, day: int, transactions: list, purchases: list):
+        """
+        Adds a day of a store to the history in one database transaction. A day that was already recorded is replaced.
+
+        transactions: Rows of a store's customer_transactions, where times are minutes of the day.
+
+        purchases: List of (customer name, item id, price, minute) for each item bought.
+        """
+
+        with self.connection:
+            self.connection.execute("DELETE FROM transactions WHERE store = ? AND day = ?", (store_name, day))
+            self.connection.execute("DELETE FROM purchases WHERE store = ? AND day = ?", (store_name, day))
+
+            self.connection.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                        ((store_name, day, int(row[0]), row[1], ";".join(row[2]), float(row[3]), row[4], row[5]) for row in transactions))
+
+            self.connection.executemany("INSERT INTO purchases VALUES (?, ?, ?, ?, ?, ?)",
+                                        ((store_name, day, customer_name, item_id, price, minute) for customer_name, item_id, price, minute in purchases))
+
+
+
+    def get_customer_purchases(self, store_name: str, customer_name: str, first_day: int = None, last_day: int = None) -> list:
+        """
+        Returns a list of (day, item id, price, minute) for each item a customer bought, in the order they were bought.
+
+        first_day: Earliest day to include. Includes every day if None.
+
+        last_day: Latest day to include. Includes every day if None.
+        """
+
+        query = "SELECT day, item_id, price, minute FROM purchases WHERE store = ? AND customer = ?"
+        query, parameters = self.__add_range(query, [store_name, customer_name], "day", first_day, last_day)
+
+        return self.connection.execute(query + " ORDER BY day, minute", parameters).fetchall()
+
+
+
+    def get_item_sales(self, store_name: str, item_id: int, first_day: int = None, last_day: int = None, start_minute: int = None, end_minute: int = None) -> list:
+        """
+        Returns a list of (day, customer name, price, minute) for each sale of an item, in the order they were sold.
+
+        first_day: Earliest day to include. Includes every day if None.
+
+        last_day: Latest day to include. Includes every day if None.
+
+        start_minute: Earliest minute of the day to include. Includes the whole day if None.
+
+        end_minute: Latest minute of the day to include. Includes the whole day if None.
+        """
+
+        query = "SELECT day, customer, price, minute FROM purchases WHERE store = ? AND item_id = ?"
+        query, parameters = self.__add_range(query, [store_name, item_id], "day", first_day, last_day)
+        query, parameters = self.__add_range(query, parameters, "minute", start_minute, end_minute)
+
+        return self.connection.execute(query + " ORDER BY day, minute", parameters).fetchall()
+
+
+
+    def get_transactions(self, store_name: str, day: int, customer_name: str = None) -> list:
+        """
+        Returns a list of (transaction id, customer name, items, money spent, time entered, time left) for a day, where times are minutes.
+
+        customer_name: Only includes the transactions of this customer if not None.
+        """
+
+        query = "SELECT transaction_id, customer, items, money_spent, time_entered, time_left FROM transactions WHERE store = ? AND day = ?"
+        parameters = [store_name, day]
+
+        if customer_name is not None:
+            query = query + " AND customer = ?"
+            parameters.append(customer_name)
+
+        return self.connection.execute(query + " ORDER BY transaction_id", parameters).fetchall()
+
+
+
+    def get_days(self, store_name: str) -> list:
+        """
+        Returns a list of the days of a store that are in the history.
+        """
+
+        return [row[0] for row in self.connection.execute("SELECT DISTINCT day FROM transactions WHERE store = ? ORDER BY day", (store_name,))]
+
+
+
+    def close(self):
+        """
+        Closes the database.
+        """
+
+        self.connection.close()
+
+
+
+    def __add_range(self, query: str, parameters: list, column_name: str, first, last) -> tuple:
+        """
+        Returns the query and parameters with conditions that column_name is between first and last. A bound of None is left out.
+        """
+
+        parameters = list(parameters)
+
+        if first is not None:
+            query = query + " AND " + column_name + " >= ?"
+            parameters.append(first)
+
+        if last is not None:
+            query = query + " AND " + column_name + " <= ?"
+            parameters.append(last)
+
+        return query, parameters